@@ -0,0 +1,81 @@
+#!/usr/bin/python3
+#################################################################
+#                     assignments_file                          #
+#################################################################
+#                                                               #
+#   Reads and writes the .jsonl files netlist_assignments_csv   #
+#   and stil_assignments_csv leave for stil2config. Each line   #
+#   is one JSON record, the first one says what the file holds  #
+#   and which version of the format it is written in            #
+#                                                               #
+#################################################################
+# Version 0.0                                                   #
+#################################################################
+#################################################################
+# Version 0.0 is first release                                  #
+# Version 0.1 pin records keep the location the csv file shows  #
+#             (format version 2)                                #
+#################################################################
+
+version = '0.1'
+
+import json
+import re
+
+formatVersion = 2
+# how stil2config tells the balls and channels of a pin apart
+ballFormat = re.compile(r'([A-Z]{1,2}[0-9]{1,2})|("")')
+channelFormat = re.compile('[0-9]{3}')
+locationFormat = re.compile(r'\(.*:Row [0-9]+\)') # (Sheet name:Row 12)
+
+def pin_location(items):
+    '''Location of a pin shown in error logs from its netlist assignments: the
+    last item if it is a location, with the one before it if that is one too,
+    e.g. ['12345','A1','(Site:Row 3)','(Site:Row 4)'] --> (Site:Row 3),(Site:Row 4)
+    and ['12345','A1','(Site:Row 3)','12346','A2','(Site:Row 4)'] --> (Site:Row 4).
+    None if the last item is not a location'''
+    if len(items) == 0 or not ':Row' in items[-1]: return None
+    if len(items) > 1 and items[-2].startswith('(') and items[-2].endswith(')'):
+        return items[-2]+','+items[-1]
+    return items[-1]
+
+def pin_record(name, items):
+    '''Record of a pin from its netlist assignments in the order they were found,
+    e.g. ['12345','A1','12346','(Site:Row 3)']. channels are per site (site 1
+    first), interleaved is True when a channel comes after a ball (the sites of
+    the pin do not line up) and location is the one shown in logs (pin_location)'''
+    channels = []; balls = []; locations = []
+    matched = False; interleaved = False
+    for item in items:
+        if locationFormat.fullmatch(item): locations.append(item); continue
+        if ballFormat.match(item): matched = True
+        if channelFormat.match(item):
+            channels.append(item); interleaved = interleaved or matched
+        else: balls.append(item)
+    return {'type':'pin', 'name':name, 'channels':channels, 'balls':balls, \
+        'locations':locations, 'location':pin_location(items), \
+        'interleaved':interleaved}
+
+def write_assignments(outputFile, kind, records, **header):
+    '''Writes the header record (format, version and any other header fields)
+    then the records, one per line'''
+    with open(outputFile,'w') as writeFile:
+        writeFile.write(json.dumps(dict(format=kind, version=formatVersion, **header))+'\n')
+        for record in records:
+            writeFile.write(json.dumps(record)+'\n')
+
+def read_assignments(inputFile, kind):
+    '''Reads a file written by write_assignments in one pass. Returns the header
+    and a dictionary of record type to list of records, or None if the file is
+    not a kind file in this version of the format'''
+    with open(inputFile,'r') as readFile:
+        try: header = json.loads(readFile.readline())
+        except ValueError: return None
+        if not isinstance(header, dict) or header.get('format') != kind or \
+            header.get('version') != formatVersion: return None
+        records = {}
+        for line in readFile:
+            if not line.strip(): continue
+            record = json.loads(line)
+            records.setdefault(record['type'],[]).append(record)
+    return header, records
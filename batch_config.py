@@ -0,0 +1,164 @@
+#!/usr/bin/python3
+#################################################################
+#                       batch_config                            #
+#################################################################
+#                                                               #
+#   This script runs stil2config for every product listed in a  #
+#   JSON manifest without asking for netlist sheets and writes  #
+#   a summary csv of the time and error log entries of each     #
+#                                                               #
+#################################################################
+# Version 0.3                                                   #
+#################################################################
+#################################################################
+# Version 0.0 is first release                                  #
+# Version 0.1 products share the parse cache                    #
+# Version 0.2 error log section headers not counted as entries  #
+# Version 0.3 products fail if a .stil pattern matches no files #
+#################################################################
+
+version = '0.3'
+
+import argparse
+import sys
+import os
+import re
+import glob
+import json
+import time
+import contextlib
+from concurrent.futures import ProcessPoolExecutor
+from stil2config import stil2config, logHeaders
+from parse_cache import defaultDir, defaultSize
+from power_supply_cards import load_cards, optional_cards
+
+# manifest keys of a product and their defaults (None = required)
+productKeys = {'name':None, 'netlist':None, 'sheets':['.*'], 'stil':[], \
+    'cards':['PS9G'], 'analog':'MCE', 'output':None}
+cardChoices = optional_cards(load_cards())
+analogChoices = ['MCE', 'MCB', 'MCA']
+
+def read_manifest(manifestFile):
+    '''Reads the list of products from a JSON manifest, e.g.
+        [{"name": "fulda_B0", "netlist": "fulda/netlist.xlsx", "sheets": ["Site.*"],
+          "stil": ["fulda/*.stil"], "cards": ["PS9G"], "analog": "MCE"}]
+    Paths are relative to the manifest. Output defaults to a folder named after
+    the product next to the manifest. Returns None if the manifest is not valid'''
+    try:
+        with open(manifestFile,'r') as manifest: entries = json.load(manifest)
+    except: return print(manifestFile+' is not a valid JSON manifest')
+    if not isinstance(entries, list): return print('Manifest must be a list of products')
+    baseDir = os.path.dirname(os.path.abspath(manifestFile))
+    products = []
+    for i in range(0,len(entries)):
+        if not isinstance(entries[i], dict): return print('Product %d is not an object'%i)
+        product = {key:entries[i].get(key,productKeys[key]) for key in productKeys}
+        unknown = [key for key in entries[i] if not key in productKeys]
+        if len(unknown) > 0:
+            return print('Unknown keys in product %d: %s'%(i,', '.join(unknown)))
+        if product['name'] == None or product['netlist'] == None:
+            return print('Product %d needs a name and a netlist'%i)
+        for key in ['sheets','stil','cards']: # single values are allowed too
+            if isinstance(product[key], str): product[key] = [product[key]]
+        if any(not card in cardChoices for card in product['cards']):
+            return print(product['name']+': cards must be in '+', '.join(cardChoices))
+        if not product['analog'] in analogChoices:
+            return print(product['name']+': analog must be in '+', '.join(analogChoices))
+        product['netlist'] = os.path.join(baseDir, product['netlist'])
+        product['stil'] = [os.path.join(baseDir, pattern) for pattern in product['stil']]
+        if product['output'] == None: product['output'] = product['name']
+        product['output'] = os.path.join(baseDir, product['output'])
+        products.append(product)
+    names = [product['name'] for product in products]
+    if len(set(names)) != len(names): return print('Product names must be unique')
+    return products
+
+def run_product(product, cacheDir=None, cacheSize=defaultSize):
+    '''Runs stil2config for one manifest product, writing everything it prints to
+    <output>/<name>_batch_log.txt. Returns the row of the summary csv, which
+    counts the error log entries without their section headers. A product with
+    a .stil pattern that matches no files fails instead of being converted
+    without .stil files'''
+    start = time.perf_counter()
+    stilFiles = []; unmatched = []
+    for pattern in product['stil']:
+        matches = sorted(glob.glob(pattern))
+        if len(matches) == 0: unmatched.append(pattern)
+        stilFiles += matches
+    if not os.path.isdir(product['output']): os.makedirs(product['output'])
+    logFile = os.path.join(product['output'], product['name']+'_batch_log.txt')
+    result = None
+    with open(logFile,'w') as log, contextlib.redirect_stdout(log):
+        try:
+            if len(unmatched) > 0: print('No .stil files match '+', '.join(unmatched))
+            else: result = stil2config([product['netlist']]+stilFiles, \
+                product['output'], product['name'], product['cards'], product['analog'],\
+                False, 1, product['sheets'], cacheDir, cacheSize)
+        except Exception as e: print('Cannot convert product: %s'%repr(e))
+    if len(unmatched) > 0:
+        print(product['name']+': no .stil files match '+', '.join(unmatched))
+    seconds = time.perf_counter() - start
+    if result == None: return [product['name'], 'FAILED', seconds, '', logFile]
+    errors = 0
+    if result[1] != None:
+        with open(result[1],'r') as err:
+            errors = sum(1 for line in err if line.strip() and \
+                not line.strip() in logHeaders)
+    return [product['name'], 'OK', seconds, errors, os.path.abspath(result[0])]
+
+def batch_config(manifestFile, summaryFile, jobs=1, cacheDir=None, cacheSize=defaultSize):
+    '''Runs every product of the manifest, in a pool of jobs processes if jobs is
+    not 1 (0 = all cores), and writes the summary csv. Returns the summary rows.
+    The products share the parse cache in cacheDir (see parse_cache)'''
+    products = read_manifest(re.sub('["\']','',manifestFile))
+    if products == None: return
+    if len(products) == 0: return print('No products in '+manifestFile)
+    print('Running %d products...'%len(products))
+    if jobs != 1 and len(products) > 1:
+        with ProcessPoolExecutor(max_workers=(jobs if jobs > 0 else None)) as pool:
+            rows = list(pool.map(run_product, products, [cacheDir]*len(products), \
+                [cacheSize]*len(products)))
+    else: rows = [run_product(product, cacheDir, cacheSize) for product in products]
+    with open(summaryFile,'w') as summary:
+        summary.write('Product,Status,Seconds,Error Log Entries,Config File\n')
+        for row in rows:
+            summary.write('%s,%s,%.2f,%s,%s\n'%tuple(row))
+    for row in rows: print('    %-20s %-6s %8.2fs'%tuple(row[0:3]))
+    print('Summary location: '+ '\x1b[0;30;43m' + os.path.relpath(summaryFile) + '\x1b[0m')
+    return rows
+
+
+if __name__ == '__main__' :
+    parser = argparse.ArgumentParser(description=\
+    '''    Run stil2config for every product in a JSON manifest without asking for
+    netlist sheets and write a summary of the time taken and number of error log
+    entries of each product''', \
+    formatter_class = argparse.RawTextHelpFormatter, epilog = 'usage examples:\n'\
+        '   batch_config -m products.json -j 4\n\n'\
+        '   batch_config -m loadboard_rev2.json -o rev2_summary.csv\n\n'\
+        'manifest format (paths relative to the manifest):\n'\
+        '   [{"name": "fulda_B0", "netlist": "fulda/netlist.xlsx",\n'\
+        '     "sheets": ["Site.*"], "stil": ["fulda/*.stil"],\n'\
+        '     "cards": ["PS9G"], "analog": "MCE", "output": "fulda_out"}]')
+    parser.add_argument('-v', '-V', '--version', dest='version', action='store_true',\
+        default=False, help='get version of script and exit')
+    parser.add_argument('-m', '--manifest', dest='manifest', required=True, \
+        help='path of the JSON manifest listing the products')
+    parser.add_argument('-o', '--output', dest='summary', default='batch_summary.csv', \
+        help='path of the summary csv. DEFAULT batch_summary.csv')
+    parser.add_argument('-j', '--jobs', dest='jobs', type=int, default=1, \
+        help='number of products run at once. 0 uses all cores. DEFAULT 1')
+    parser.add_argument('--cache', dest='cacheDir', default=defaultDir, \
+        help='folder of the parse cache. DEFAULT $STIL2CONFIG_CACHE or\n'\
+            '~/.cache/stil2config')
+    parser.add_argument('--no-cache', dest='cacheDir', action='store_const', \
+        const=None, help='always parse the netlists and .stil files, do not use the\n'\
+            'parse cache')
+    parser.add_argument('--cache-size', dest='cacheSize', type=int, default=defaultSize,\
+        help='size of the parse cache in MB. DEFAULT %d' % defaultSize)
+    args = parser.parse_args()
+    if args.version: print('Version '+version); sys.exit()
+    try:
+        batch_config(args.manifest, args.summary, args.jobs, args.cacheDir, args.cacheSize)
+    except KeyboardInterrupt:
+        print('\n Keyboard Interrupt: Process Killed')
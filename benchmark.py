@@ -0,0 +1,381 @@
+#!/usr/bin/python3
+#################################################################
+#                          benchmark                            #
+#################################################################
+#                                                               #
+#   Generates synthetic netlists and .stil files of a given     #
+#   number of pins and sites, runs stil2config on them and      #
+#   times each stage. Fails if the outputs are not the golden   #
+#   ones or a stage is slower than the saved baseline of this   #
+#   machine by more than a threshold                            #
+#                                                               #
+#################################################################
+# Version 0.2                                                   #
+#################################################################
+#################################################################
+# Version 0.0 is first release                                  #
+# Version 0.1 times how fast a run on assignment files starts   #
+# Version 0.2 outputs checked against committed golden digests, #
+#             apart from the timings of the machine             #
+#################################################################
+
+version = '0.2'
+
+import argparse
+import sys
+import os
+import re
+import json
+import random
+import shutil
+import tempfile
+import contextlib
+import subprocess
+import tracemalloc
+from openpyxl import Workbook
+from stil2config import stil2config
+from stage_profiler import Profiler
+from parse_cache import file_digest
+
+scriptDir = os.path.dirname(os.path.abspath(__file__))
+baselineFile = os.path.join(scriptDir, 'benchmark_baseline.json') # timings
+goldenFile = os.path.join(scriptDir, 'benchmark_golden.json') # output digests
+defaultSizes = ['1000x1', '1000x4', '10000x8'] # pins x sites
+defaultThreshold = 25 # percent
+minimumSeconds = 0.05 # slower by less than this is noise
+sheetRows = 20000 # pins per netlist sheet
+# outputs checked against the golden digests
+outputFiles = ['bench.conf', 'bench_config_error_log.txt', \
+    'bench_netlist_assignments.jsonl', 'bench_stil_assignments.jsonl']
+
+# modules a run on .jsonl/csv assignment files should not need to import
+heavyModules = ['pandas', 'openpyxl', 'numpy']
+# run in a new python process, prints the seconds taken and heavy modules imported
+importCode = '''import sys, os, time, json, contextlib
+start = time.perf_counter()
+%s
+seconds = time.perf_counter()-start
+print(json.dumps({'seconds':seconds, 'modules':[x for x in %r if x in sys.modules]}))'''
+
+buses = ['DATA', 'ADDR', 'CTRL_CLK', 'JTAG_TD', 'GPIO', 'SPI_MOSI', 'DDR_DQ', 'SERDES_RX']
+ballLetters = 'ABCDEFGHJKLMNPRTUVWY'
+ballRows = list(ballLetters) + [a+b for a in ballLetters for b in ballLetters]
+
+def ball_name(i):
+    '''Ball of the i-th row of the netlist, row by row (A1..A99, B1..). Packages
+    only have so many balls so they repeat after YY99'''
+    i = i % (len(ballRows)*99)
+    return ballRows[i//99] + str(i%99+1)
+
+def channel_text(channel, style):
+    '''A 5 number channel written in one of the netlist formats'''
+    if style == 0: return channel # a number cell
+    if style == 1: return 'CH%d'%channel
+    if style == 2: return 'TC%d'%channel
+    if style == 3: return '%d.%02d'%(channel//100, channel%100)
+    if style == 4: return '%d-P%d'%(channel//100, channel%100)
+    return str(channel)
+
+def synthetic_pins(pins, seed):
+    '''Names and kinds ('digital', 'analog' or 'supply') of the synthetic pins.
+    Supplies are on several balls, analog pins use 231x pads'''
+    rand = random.Random(seed)
+    names = []
+    for i in range(0,pins):
+        kind = rand.choices(['digital','analog','supply'], [96,2,2])[0]
+        if kind == 'analog': name = 'ADC_IN%d'%i
+        elif kind == 'supply': name = 'VDD_CORE%d'%i
+        elif rand.random() < 0.5: name = '%s[%d]'%(rand.choice(buses), i)
+        else: name = '%s_%d'%(rand.choice(buses), i)
+        names.append((name, kind))
+    return names
+
+def make_netlist(fileName, pinNames, sites, seed):
+    '''Writes an .xlsx netlist of the pins with a channel column per site, mixed
+    channel formats, analog pads (231A+ ...) and supplies on several balls'''
+    rand = random.Random(seed)
+    pads = ['A+','B+','C+','D+','AA-','BB-','EE+','HH-']
+    workbook = Workbook(write_only=True)
+    notes = workbook.create_sheet('Notes'); notes.append(['synthetic netlist'])
+    header = ['Ball', 'Net Name'] + ['Site%d CH'%site for site in range(1,sites+1)] + \
+        ['Trace length', 'Comment']
+    row = 0; channel = 0
+    for first in range(0,len(pinNames),sheetRows):
+        worksheet = workbook.create_sheet('Netlist %d'%(first//sheetRows+1))
+        worksheet.append(header)
+        for name, kind in pinNames[first:first+sheetRows]:
+            balls = rand.randint(2,4) if kind == 'supply' else 1
+            style = rand.randint(0,5)
+            channels = []
+            for site in range(0,sites): # cards 101-899, pins 01-16 on each
+                number = channel + site*len(pinNames)
+                channels.append((101+number//16%799)*100 + number%16+1)
+            channel += 1
+            if kind == 'analog':
+                cells = ['231'+pads[(channel+site)%len(pads)] for site in range(0,sites)]
+            else: cells = [channel_text(number, style) for number in channels]
+            for ball in range(0,balls):
+                worksheet.append([ball_name(row), name] + cells + \
+                    [round(rand.random()*20,3), None])
+                row += 1
+    workbook.save(fileName)
+
+def make_stil(fileNames, pinNames, drift, seed):
+    '''Writes the signals of the pins to .stil files, each file with most of them.
+    drift is the part of the names changed (e.g. U1_DATA_3 for DATA_3) or only in
+    the .stil files, to exercise transfer matching'''
+    rand = random.Random(seed)
+    signals = []
+    for name, kind in pinNames:
+        if kind == 'supply': continue
+        if rand.random() < drift/2: name = 'U1_'+name
+        signals.append(name)
+    signals += ['EXTRA_SIG_%d'%i for i in range(0,int(len(signals)*drift/2))]
+    for fileName in fileNames:
+        with open(fileName,'w') as stil:
+            stil.write('STIL 1.0;\nHeader { Title "synthetic"; }\nSignals {\n')
+            for name in signals:
+                if rand.random() < 0.2: continue
+                stil.write('  "%s" %s;\n'%(name, rand.choice(['In','Out','InOut'])))
+            stil.write('}\nSignalGroups {\n  all = \'%s\';\n}\n'%\
+                '+'.join('"%s"'%name for name in signals[:8]))
+            stil.write('Pattern p { V { all = 01010101; } }\n')
+
+def parse_size(size):
+    '''1000x4 --> (1000, 4) pins and sites'''
+    match = re.fullmatch('([0-9]+)(k?)x([0-9]+)', size.lower())
+    if match == None: return None
+    return int(match.group(1))*(1000 if match.group(2) else 1), int(match.group(3))
+
+def run_case(size, drift, jobs, repeat, seed):
+    '''Generates the inputs of one size and runs stil2config on them repeat times.
+    Returns the fastest wall time of each stage, the peak memory and the output
+    digests'''
+    pins, sites = parse_size(size)
+    workDir = tempfile.mkdtemp(prefix='stil2config_bench_')
+    try:
+        pinNames = synthetic_pins(pins, seed)
+        netlist = os.path.join(workDir, 'bench_netlist.xlsx')
+        make_netlist(netlist, pinNames, sites, seed)
+        stilFiles = [os.path.join(workDir, 'bench_%d.stil'%i) for i in range(0,2)]
+        make_stil(stilFiles, pinNames, drift, seed)
+        stages = {}; peak = 0; outputs = None
+        for run in range(0,repeat):
+            outputDir = os.path.join(workDir, 'out%d'%run)
+            profiler = Profiler()
+            with open(os.devnull,'w') as devnull, contextlib.redirect_stdout(devnull):
+                result = stil2config([netlist]+stilFiles, outputDir, 'bench', ['PS9G'], \
+                    'MCE', False, jobs, ['.*'], None, profiler=profiler)
+            report = profiler.report(); tracemalloc.stop()
+            if result == None: return None
+            for stage in report['stages']:
+                stages[stage['name']] = min(stages.get(stage['name'],stage['wall']), \
+                    stage['wall'])
+            stages['total'] = min(stages.get('total',report['wall']), report['wall'])
+            peak = max(peak, report['peakMB'])
+            outputs = {name:file_digest(os.path.join(outputDir, name)) if \
+                os.path.isfile(os.path.join(outputDir, name)) else None \
+                for name in outputFiles}
+        return {'stages':stages, 'peakMB':peak, 'outputs':outputs, \
+            'counts':report['counts']}
+    finally: shutil.rmtree(workDir, ignore_errors=True)
+
+def compare_case(size, case, baseline, golden, threshold):
+    '''Prints the stage times of a case next to its baseline. Returns the list of
+    failures (outputs not the same as the golden ones or without golden ones and
+    stages slower than the threshold)'''
+    failures = []
+    print('\n%s pins x sites, peak %.1f MB'%(size, case['peakMB']))
+    print('    %-22s %10s %10s %8s'%('Stage','Baseline','Now','Change'))
+    for name in case['stages']:
+        now = case['stages'][name]
+        base = baseline['stages'].get(name) if baseline else None
+        if base == None: print('    %-22s %10s %9.3fs'%(name, '-', now)); continue
+        change = (now-base)/base*100 if base > 0 else 0
+        slower = change > threshold and now-base > minimumSeconds
+        print('    %-22s %9.3fs %9.3fs %+7.1f%%%s'%(name, base, now, change, \
+            '  SLOWER' if slower else ''))
+        if slower: failures.append('%s: %s is %.1f%% slower'%(size, name, change))
+    if golden == None:
+        failures.append('%s: no golden outputs for these settings, check the outputs'\
+            ' and save them with --save-golden'%size)
+    else:
+        for name in outputFiles:
+            if golden['outputs'].get(name) != case['outputs'][name]:
+                failures.append('%s: %s is not the golden output'%(size, name))
+    return failures
+
+def load_json(fileName, kind):
+    '''Cases saved in a baseline or golden JSON file by size, {} if there is no
+    file, None if it cannot be read'''
+    if not os.path.isfile(fileName): return {}
+    try:
+        with open(fileName,'r') as readFile: return json.load(readFile)
+    except ValueError: return print(fileName+' is not a valid '+kind)
+
+def matching(saved, settings):
+    '''The saved case if it was generated and run with the same settings'''
+    if saved and all(saved.get(key) == settings[key] for key in settings): return saved
+    return None
+
+def timed_python(statements, repeat):
+    '''Runs the statements in a new python process repeat times. Returns the
+    fastest time and the heavy modules they imported, None if they failed'''
+    best = None
+    for run in range(0,repeat):
+        result = subprocess.run([sys.executable, '-c', importCode%(statements, \
+            heavyModules)], capture_output=True, text=True, cwd=scriptDir)
+        if result.returncode != 0: return None
+        timing = json.loads(result.stdout.strip().splitlines()[-1])
+        if best == None or timing['seconds'] < best['seconds']: best = timing
+    return best
+
+def import_benchmark(size='1000x1', repeat=5, seed=1):
+    '''Times the start of stil2config in a new python process: importing it with
+    the heavy modules only imported when needed, importing it the way it was
+    with them imported at load, and a whole run on the .jsonl assignment files
+    of a synthetic case up to the ball map (which needs openpyxl). Returns the
+    failures (heavy modules imported by the run), None if it could not run'''
+    pins, sites = parse_size(size)
+    workDir = tempfile.mkdtemp(prefix='stil2config_bench_')
+    try:
+        pinNames = synthetic_pins(pins, seed)
+        netlist = os.path.join(workDir, 'bench_netlist.xlsx')
+        make_netlist(netlist, pinNames, sites, seed)
+        stilFiles = [os.path.join(workDir, 'bench_%d.stil'%i) for i in range(0,2)]
+        make_stil(stilFiles, pinNames, drift=0.05, seed=seed)
+        inputDir = os.path.join(workDir, 'in')
+        with open(os.devnull,'w') as devnull, contextlib.redirect_stdout(devnull):
+            if stil2config([netlist]+stilFiles, inputDir, 'bench', ['PS9G'], 'MCE', \
+                False, sheets=['.*']) == None: return None
+        assignments = [os.path.join(inputDir, 'bench_%s_assignments.jsonl'%x) \
+            for x in ['netlist','stil']]
+        # the ball map is the only part of a run on assignment files using openpyxl
+        run = 'import stil2config\nstil2config.make_excel_docs = lambda *args: None\n'\
+            'with open(os.devnull,"w") as out, contextlib.redirect_stdout(out):\n'\
+            '    stil2config.stil2config(%r, %r, "bench", ["PS9G"], "MCE", False)'%\
+            (assignments, os.path.join(workDir, 'out'))
+        cases = [('import stil2config', 'import stil2config'), \
+            ('import at load', 'import openpyxl\nimport stil2config'), \
+            ('run on assignments', run)]
+        timings = {}
+        for name, statements in cases:
+            timings[name] = timed_python(statements, repeat)
+            if timings[name] == None: return print(name+' failed')
+    finally: shutil.rmtree(workDir, ignore_errors=True)
+    print('\n%s pins x sites, fastest of %d new python processes'%(size, repeat))
+    print('    %-22s %10s  %s'%('Start','Time','Heavy modules imported'))
+    for name in timings:
+        print('    %-22s %9.3fs  %s'%(name, timings[name]['seconds'], \
+            ', '.join(timings[name]['modules']) if timings[name]['modules'] else '-'))
+    eager = timings['import at load']['seconds']
+    print('    import stil2config takes %.0f%% of the time importing at load did'%\
+        (timings['import stil2config']['seconds']/eager*100))
+    failures = ['run on assignments imported '+x for x in \
+        timings['run on assignments']['modules']]
+    for failure in failures: print('FAIL '+failure)
+    return failures
+
+def benchmark(sizes, baselineName=baselineFile, threshold=defaultThreshold, drift=0.05,\
+    jobs=1, repeat=1, seed=1, save=False, goldenName=goldenFile, saveGolden=False):
+    '''Runs every size (e.g. 1000x4 for 1000 pins on 4 sites), compares the stage
+    times with the baseline of this machine and the outputs with the golden ones,
+    or saves them as the baseline and/or the golden outputs. Returns the
+    failures, None if the benchmark could not run'''
+    for size in sizes:
+        if parse_size(size) == None: return print(size+' is not a size like 1000x4')
+    baselines = load_json(baselineName, 'baseline')
+    goldens = load_json(goldenName, 'golden file')
+    if baselines == None or goldens == None: return None
+    # cases are only comparable when generated and run the same way, the outputs
+    # do not depend on the number of jobs
+    settings = {'drift':drift, 'jobs':jobs, 'seed':seed}
+    inputSettings = {'drift':drift, 'seed':seed}
+    failures = []; cases = {}; outputs = {}
+    for size in sizes:
+        print('Running %s...'%size, end='\r')
+        case = run_case(size, drift, jobs, repeat, seed)
+        if case == None: failures.append(size+': stil2config failed'); continue
+        key = '%dx%d'%parse_size(size) # 1kx4 and 1000x4 are the same case
+        cases[key] = dict({name:case[name] for name in ['stages','peakMB','counts']}, \
+            **settings)
+        outputs[key] = dict(outputs=case['outputs'], **inputSettings)
+        baseline = matching(baselines.get(key), settings)
+        if baselines.get(key) and baseline == None:
+            print('\n%s baseline was run with other settings, not compared'%size)
+        # outputs being saved as the golden ones are not checked
+        golden = outputs[key] if saveGolden else matching(goldens.get(key), inputSettings)
+        failures += compare_case(size, case, None if save else baseline, golden, \
+            threshold)
+    if save:
+        baselines.update(cases)
+        with open(baselineName,'w') as baseFile: json.dump(baselines, baseFile, indent=1)
+        print('\nBaseline location: '+os.path.relpath(baselineName))
+    if saveGolden:
+        goldens.update(outputs)
+        with open(goldenName,'w') as goldFile: json.dump(goldens, goldFile, indent=1)
+        print('\nGolden outputs location: '+os.path.relpath(goldenName))
+    print('')
+    for failure in failures: print('FAIL '+failure)
+    if len(failures) == 0 and not save: print('All stages within %d%%'%threshold)
+    return failures
+
+
+if __name__ == '__main__' :
+    parser = argparse.ArgumentParser(description=\
+    '''    Generate synthetic netlists and .stil files, run stil2config on them and
+    time each stage (workbook load, sheet conversion, STIL parsing, diffing,
+    transfer matching, .conf writing, Excel rendering, ...). Fails if the outputs
+    are not the golden ones or a stage is slower than the baseline by more than
+    the threshold''', \
+    formatter_class = argparse.RawTextHelpFormatter, epilog = 'usage examples:\n'\
+        '   benchmark --save-baseline\n\n'\
+        '   benchmark -s 1kx1 --save-golden\n\n'\
+        '   benchmark -s 1kx1 10kx8 200kx32 -t 20\n\n'\
+        '   benchmark -s 50000x16 -r 3 -j 4\n\n'\
+        '   benchmark --imports -r 10')
+    parser.add_argument('-v', '-V', '--version', dest='version', action='store_true',\
+        default=False, help='get version of script and exit')
+    parser.add_argument('-s', '--sizes', nargs='+', dest='sizes', default=defaultSizes, \
+        help='pins x sites of each case (e.g. 1000x4 or 200kx32).\n'\
+            'DEFAULT %s'%' '.join(defaultSizes))
+    parser.add_argument('-b', '--baseline', dest='baseline', default=baselineFile, \
+        help='baseline JSON file. DEFAULT benchmark_baseline.json next to this script')
+    parser.add_argument('--save-baseline', dest='save', action='store_true', \
+        default=False, help='save the times as the baseline of this machine instead\n'\
+            'of comparing with it')
+    parser.add_argument('-g', '--golden', dest='golden', default=goldenFile, \
+        help='JSON file of the golden output digests. DEFAULT benchmark_golden.json\n'\
+            'next to this script')
+    parser.add_argument('--save-golden', dest='saveGolden', action='store_true', \
+        default=False, help='save the output digests as the golden ones instead of\n'\
+            'checking them, only after checking the outputs are right')
+    parser.add_argument('-t', '--threshold', dest='threshold', type=float, \
+        default=defaultThreshold, help='percent a stage may be slower than the '\
+            'baseline. DEFAULT %d'%defaultThreshold)
+    parser.add_argument('-d', '--drift', dest='drift', type=float, default=0.05, \
+        help='part of the .stil names that are not in the netlist. DEFAULT 0.05')
+    parser.add_argument('-j', '--jobs', dest='jobs', type=int, default=1, \
+        help='jobs stil2config is run with. DEFAULT 1')
+    parser.add_argument('-r', '--repeat', dest='repeat', type=int, default=1, \
+        help='times each case is run, the fastest time of each stage is used.\n'\
+            'DEFAULT 1')
+    parser.add_argument('--seed', dest='seed', type=int, default=1, \
+        help='seed of the synthetic inputs. DEFAULT 1')
+    parser.add_argument('--imports', dest='imports', action='store_true', \
+        default=False, help='time how fast stil2config starts in a new python process\n'\
+            'instead (on the first size, -r times) and fail if a run on\n'\
+            'assignment files imports pandas, openpyxl or numpy')
+    args = parser.parse_args()
+    if args.version: print('Version '+version); sys.exit()
+    try:
+        if args.imports:
+            if parse_size(args.sizes[0]) == None:
+                print(args.sizes[0]+' is not a size like 1000x4'); sys.exit(1)
+            failures = import_benchmark(args.sizes[0], max(args.repeat,1), args.seed)
+        else: failures = benchmark(args.sizes, args.baseline, args.threshold, args.drift, \
+            args.jobs, max(args.repeat,1), args.seed, args.save, args.golden, \
+            args.saveGolden)
+    except KeyboardInterrupt:
+        print('\n Keyboard Interrupt: Process Killed'); sys.exit(1)
+    if failures == None or len(failures) > 0: sys.exit(1)
@@ -0,0 +1,114 @@
+#!/usr/bin/python3
+#################################################################
+#                     channel_decoder                           #
+#################################################################
+#                                                               #
+#   Decodes the tester channel assignments written in a netlist #
+#   cell (or a netlist assignments csv) into the 5 number       #
+#   channels or the analog pad they stand for. Used by both     #
+#   netlist_assignments_csv and stil2config                     #
+#                                                               #
+#################################################################
+# Version 0.2                                                   #
+#################################################################
+#################################################################
+# Version 0.0 is first release                                  #
+# Version 0.1 12345-6 ranges expanded, \b is a word boundary    #
+# Version 0.2 ranges ending below their start are not channels  #
+#################################################################
+
+version = '0.2'
+
+import re
+from collections import namedtuple
+from functools import lru_cache
+
+# text: channel as written in the netlist csv (e.g. 123-P4-P5)
+# kind: 'digital' (channels is a tuple of 5 number channels), 'analog' (pad is
+#       the pinconfig mode value and direction 'i'/'o', None if not a known pad)
+#       or 'other' (not a known format or a range ending below its start, used
+#       as is)
+ChannelSpec = namedtuple('ChannelSpec', ['text', 'kind', 'channels', 'pad', 'direction'])
+
+#weird but given conversions to mode value in pinconfig (value is index+1)
+conversionTable = ['A+','B+','C+','D+','A-','B-','C-','D-','E+','F+','G+','H+',\
+    'E-','F-','G-','H-','AA+','BB+','CC+','DD+','AA-','BB-','CC-','DD-','EE+','FF+',\
+    'GG+','HH+','EE-','FF-','GG-','HH-']
+padModes = {pad:conversionTable.index(pad)+1 for pad in conversionTable}
+# decoded cells kept, bounded so a long running process (--watch) does not keep
+# the cells of every netlist revision it has read
+cacheEntries = 1<<16
+
+# formats of a channel in a cell, in the order they are tried
+channelFormats = [re.compile(r'([0-9]{5}-[0-9]{1,2}|[0-9]{5})(\Z|\s|\b)'), # 12345-6 or 12345
+    re.compile(r'[0-9]{3}-P[0-9]{1,2}(-P[0-9]{1,2})?(\Z|\s|\b)'), #123-P4 or 123-P45 or 123-P4-P5
+    re.compile(r'[0-9]{3}(([A-Z]{1,2}[+|-])|CT1|CT2)(\Z|\s|\b)')] #123A+ or 123HH- or CT1
+analogFormat = channelFormats[2]
+pinFormat = re.compile(r'([0-9]{3})-P([0-9]{1,2})(\Z|\s|\b)') # 123-P4
+pinRangeFormat = re.compile(r'([0-9]{3})-P([0-9]{1,2})-P([0-9]{1,2})(\Z|\s|\b)') # 123-P4-P5
+channelRangeFormat = re.compile(r'([0-9]{5})-([0-9]{1,2})(\Z|\s|\b)') # 12345-6
+fiveNumbers = re.compile('[0-9]{5}')
+embeddedChannel = re.compile('[^0-9][0-9]{5}[^0-9]') # *12345*
+cellPrefixes = re.compile('TC|CH')
+namedChannel = re.compile('_.*_')
+threeNumbers = re.compile('[0-9]{3}')
+dottedChannel = re.compile(r'[0-9]{3}\.[0-9]{2}')
+numbers = re.compile('[0-9]')
+
+@lru_cache(maxsize=cacheEntries)
+def decode_cell(text):
+    '''Finds a channel assignment in the text of a netlist cell. Accepts the
+    formats listed in netlist_assignments_csv (12345, 12345-6, 123-P4, 123-P4-P5,
+    123.45, 231A+, PF1-PF12_NAME_345, PF1_NAME_234 and any of them proceeded by
+    CH/TC). Returns the ChannelSpec or None if there is no channel'''
+    if fiveNumbers.fullmatch(text): return decode_channel(text) # most common
+    # get rid of letters before channel
+    entry = cellPrefixes.sub('', text).replace('PF','P')
+    entry = entry.replace('MCE', '231')
+    # channel formats like PF13-PF16_DPS32_425
+    entry = namedChannel.sub('_', entry)
+    if '_'in entry and threeNumbers.search(entry):
+        entry = entry[entry.find('_')+1:]+'-'+entry[:entry.find('_')]
+    # 123.45 format
+    if dottedChannel.search(entry) != None:
+        entry = entry.replace('.','')
+    for fmt in channelFormats:
+        channel = fmt.match(entry)
+        if channel: return decode_channel(channel.group(0).strip())
+    channel = embeddedChannel.search(entry)
+    if channel: return decode_channel(channel.group(0)[1:6])
+    return None
+
+@lru_cache(maxsize=cacheEntries)
+def decode_channel(text):
+    '''Expands a channel as written in the netlist csv into a ChannelSpec
+        123-P4 --> (12304)   123-P4-P5 --> (12304,12305)   12345-6 --> (12345,12346)
+        231A+ --> analog pad 1 input                       12345 --> (12345)
+    A range ending below its start (e.g. 12349-2 or 123-P5-P4) is kind 'other' and
+    has no channels'''
+    # analog pins that need the conversion (231A+ etc.)
+    if analogFormat.match(text):
+        pad = numbers.sub('',text).strip()
+        if not pad in padModes: return ChannelSpec(text, 'analog', (), None, None)
+        return ChannelSpec(text, 'analog', (), padModes[pad], 'o' if len(pad) == 3 else 'i')
+    pinRange = pinRangeFormat.match(text); pin = pinFormat.match(text)
+    channelRange = channelRangeFormat.match(text)
+    # format 123-P4-P5 --> [12304,12305] (before 123-P4, which it starts with)
+    if pinRange:
+        card, start, end = pinRange.group(1), int(pinRange.group(2)), int(pinRange.group(3))
+        channels = tuple(int(card+'%02d' % j) for j in range(start, end+1))
+    # format 123-P4 --> [12304]
+    elif pin: channels = (int(pin.group(1) + '%02d' % int(pin.group(2))),)
+    # format 12345-6 --> [12345,12346], the end replaces the last numbers
+    elif channelRange:
+        start, last = channelRange.group(1), channelRange.group(2)
+        channels = tuple(range(int(start), int(start[0:5-len(last)]+last)+1))
+    # already in format [12345]
+    elif fiveNumbers.fullmatch(text): channels = (int(text),)
+    else: return ChannelSpec(text, 'other', (), None, None)
+    if len(channels) == 0: return ChannelSpec(text, 'other', (), None, None)
+    return ChannelSpec(text, 'digital', channels, None, None)
+
+def channel_names(spec):
+    '''5 number channel names of a decoded digital channel (e.g. ['12304'])'''
+    return ['%05d' % channel for channel in spec.channels]
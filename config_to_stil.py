@@ -1,24 +1,133 @@
+#!/usr/bin/python3
+#################################################################
+#                        config_to_stil                         #
+#################################################################
+#                                                               #
+#   Writes the Signals and SignalGroups of a .stil header from  #
+#   a .conf file: the In/Out/InOut signals from the CONF lines  #
+#   and a group for each DFGP group. The .conf is read one line #
+#   at a time so big multi-site configs are not held in memory  #
+#                                                               #
+#################################################################
+# Version 0.1                                                   #
+#################################################################
+#################################################################
+# Version 0.0 is first release                                  #
+# Version 0.1 empty CONF pins skipped, groups only keep the     #
+#             pins written as signals                           #
+#################################################################
+
+version = '0.1'
+
+import argparse
+import os
+import re
 import sys
-file = sys.argv[1]
-with open(file,'r') as reader:
-    with open(file+'.stil','w') as writer:
-        writer.write('Signals {\n')
-        contents = reader.read()
-        confs = contents[contents.find('CONF'):]
-        lines = confs.split('\n')
-        for line in lines:
-            group = None
-            if line.startswith('CONF I,'):
-                group = line[line.find('(')+1:line.rfind(')')]
-                group = group.split(',')
-                writer.write(' In; \n'.join(group)+' In; \n')
-            elif line.startswith('CONF O,'):
-                group = line[line.find('(')+1:line.rfind(')')]
-                group = group.split(',')
-                writer.write(' Out; \n'.join(group)+' Out; \n')
-            elif line.startswith('CONF IO,'):
-                group = line[line.find('(')+1:line.rfind(')')]
-                group = group.split(',')
-                writer.write(' InOut; \n'.join(group)+' InOut; \n')
-        writer.write('}')
-        
\ No newline at end of file
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from hp93000_config import read_config
+
+directions = {'I':'In', 'O':'Out', 'IO':'InOut'}
+# names that are not a plain STIL identifier (e.g. DATA[0]) are written in quotes
+stilName = re.compile('[A-Za-z_][A-Za-z0-9_]*')
+
+def stil_name(name):
+    '''DATA_0 --> DATA_0, DATA[0] --> "DATA[0]"'''
+    return name if stilName.fullmatch(name) else '"%s"'%name
+
+def group_text(name, pins):
+    '''addr = 'ADDR_0+ADDR_1'; line of a SignalGroups block'''
+    return "    %s = '%s';\n"%(stil_name(name), '+'.join(stil_name(x) for x in pins))
+
+def config_to_stil(configFile, stilFile):
+    '''Writes the .stil header of one .conf file. Signals are written as their CONF
+    lines are read (empty ones like CONF O,F160,() have none), groups go to a
+    temporary file and are added after the Signals with only the pins that were
+    written as signals, a group left with no pins is dropped. DFGP lines of the
+    same group that follow each other (e.g. its I and O lines) are one group, a
+    group name that comes again later gets its mode added (e.g. data_O). Returns
+    the number of signals and groups'''
+    signals = 0; groups = 0; declared = set()
+    groupNames = set(); current = None; group = None; groupPins = {}
+    with open(stilFile,'w') as writer, tempfile.TemporaryFile('w+') as groupFile:
+        writer.write('STIL 1.0;\n\nSignals {\n')
+        for entry in read_config(configFile):
+            if entry.kind == 'CONF' and entry.mode in directions:
+                direction = ' %s;\n'%directions[entry.mode]
+                for pin in entry.pins:
+                    if pin == '': continue
+                    writer.write('    '+stil_name(pin)+direction)
+                    declared.add(pin); signals += 1
+            elif entry.kind == 'DFGP' and entry.mode != None:
+                text = entry.text
+                name = text[text.rfind('(')+1:-1]
+                if name != current:
+                    # one line of tab separated group and pin names
+                    if current != None:
+                        groupFile.write('\t'.join([group]+list(groupPins))+'\n')
+                    current = name; group = name; groupPins = {}
+                    if name in groupNames: group = name+'_'+entry.mode
+                    groupNames.add(group)
+                for pin in entry.pins: groupPins[pin] = None # ordered, no repeats
+        if current != None: groupFile.write('\t'.join([group]+list(groupPins))+'\n')
+        writer.write('}\n')
+        groupFile.seek(0)
+        for line in groupFile:
+            names = line.rstrip('\n').split('\t')
+            pins = [pin for pin in names[1:] if pin in declared]
+            if len(pins) == 0: continue
+            if groups == 0: writer.write('\nSignalGroups {\n')
+            writer.write(group_text(names[0], pins)); groups += 1
+        if groups > 0: writer.write('}\n')
+    return signals, groups
+
+def convert_config(configFile, outputDir=None):
+    '''Converts one .conf file to <configFile>.stil in outputDir (default the folder
+    of the .conf). Returns the .stil file name and its numbers of signals and groups
+    or None if the .conf cannot be read'''
+    folder = outputDir if outputDir != None else os.path.dirname(configFile)
+    stilFile = os.path.join(folder, os.path.basename(configFile)+'.stil')
+    try: signals, groups = config_to_stil(configFile, stilFile)
+    except OSError: return None
+    return stilFile, signals, groups
+
+def configs_to_stil(configFiles, outputDir=None, jobs=1):
+    '''Converts .conf files to .stil headers, in a pool of jobs processes if jobs is
+    not 1 (0 = all cores). Returns the results of convert_config in order'''
+    if outputDir != None and not os.path.exists(outputDir): os.makedirs(outputDir)
+    outputDirs = [outputDir]*len(configFiles)
+    if jobs != 1 and len(configFiles) > 1:
+        with ProcessPoolExecutor(max_workers=(jobs if jobs > 0 else None)) as pool:
+            results = list(pool.map(convert_config, configFiles, outputDirs))
+    else: results = [convert_config(x, y) for x, y in zip(configFiles, outputDirs)]
+    for configFile, result in zip(configFiles, results):
+        if result == None: print('Cannot convert '+configFile); continue
+        print('Stil file location: ', os.path.relpath(result[0]), \
+            '(%d signals, %d groups)'%result[1:])
+    return results
+
+if __name__ == '__main__' :
+    parser = argparse.ArgumentParser(description=\
+    '''    Convert .conf file(s) into the Signals and SignalGroups of a .stil file''',\
+    formatter_class = argparse.RawTextHelpFormatter, epilog = 'usage examples:\n'\
+        '   config_to_stil -i product.conf\n\n'\
+        '   config_to_stil -i fulda_A0.conf fulda_B0.conf -o stil/ -j 2')
+    parser.add_argument('-v', '-V', '--version', dest='version', action='store_true',\
+        default=False, help='get version of script and exit')
+    parser.add_argument('-i', '--input', dest='inputs', nargs = '+', default=[], \
+        help='.conf file(s), each is written to <.conf file>.stil')
+    parser.add_argument('-o', '--output', dest='outputDir', default=None, \
+        help='output folder path. creates output path if DNE. DEFAULT folder of\n'\
+            'each .conf file')
+    parser.add_argument('-j', '--jobs', dest='jobs', type=int, default=1, \
+        help='number of processes converting .conf files. 0 uses all cores. DEFAULT 1')
+    parser.add_argument('configs', nargs='*', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.version: print('Version '+version); sys.exit()
+    configFiles = args.inputs + args.configs # config_to_stil file.conf still works
+    if len(configFiles) == 0: parser.error('no .conf file given (-i)')
+    try:
+        results = configs_to_stil(configFiles, args.outputDir, args.jobs)
+    except KeyboardInterrupt:
+        print('\n Keyboard Interrupt: Process Killed'); sys.exit(1)
+    if None in results: sys.exit(1)
@@ -1,26 +1,182 @@
 #!/usr/bin/python3
+#################################################################
+#                            diff                               #
+#################################################################
+#                                                               #
+#   Compares two .conf files entry by entry. Pin definitions    #
+#   are matched by pin name and site so a changed channel or    #
+#   ball is one change of that pin, groups by their name so     #
+#   their membership changes are listed pin by pin. Prints the  #
+#   changes as text and can write them to a JSON file           #
+#                                                               #
+#################################################################
+# Version 0.1                                                   #
+#################################################################
+#################################################################
+# Version 0.0 is first release                                  #
+# Version 0.1 repeated pins of a group are compared too         #
+#################################################################
+
+version = '0.1'
+
+import argparse
 import sys
+import json
+from collections import Counter
+from hp93000_config import read_config
+
+pinFields = {'pin':['kind','channels','ball'], 'analog':['analog','ball']}
+
+def entry_key(entry):
+    '''Key and compared value of a .conf entry:
+        DFPN/DFPS/PALS ('pin', pin, site) --> (kind, channels, ball)
+        DFAN ('analog', pin) --> (instrument, pad and direction, ball)
+        CONF ('CONF', mode and type) --> pin names and how often they come
+        DFGP ('DFGP', group, mode) --> pin names and how often they come
+        other lines ('line', text) --> None
+    DFPN and DFPS are site 1. A pin has a DFAN entry per site, keyed_entries
+    adds its place among them'''
+    if entry.text == None and entry.kind == 'DFAN':
+        return ('analog', entry.pin), ('%s231,%d,%s'%entry.analog, entry.ball)
+    if entry.text == None:
+        return ('pin', entry.pin, entry.site), (entry.kind, entry.channels, entry.ball)
+    if entry.mode != None and entry.kind == 'CONF':
+        return ('CONF', entry.text[5:entry.text.find('(')].rstrip(',')), \
+            Counter(entry.pins)
+    if entry.mode != None and entry.kind == 'DFGP':
+        return ('DFGP', entry.text[entry.text.rfind('(')+1:-1], entry.mode), \
+            Counter(entry.pins)
+    return ('line', entry.text), None
+
+def keyed_entries(fileName):
+    '''Yields the key (see entry_key) and value of every entry of a .conf file.
+    DFAN keys get the place of the entry among those of its pin (1, 2, ...) so
+    a changed pad is a change of that site, other keys that come again get the
+    number of times they came before added'''
+    seen = {}
+    for entry in read_config(fileName):
+        key, value = entry_key(entry)
+        seen[key] = seen[key]+1 if key in seen else 0
+        if key[0] == 'analog': key = key+(seen[key]+1,)
+        elif seen[key] > 0: key = key+(seen[key],)
+        yield key, value
+
+def pin_changes(key, old, new):
+    '''Changes of one site of a pin, a whole site if it is only in one file'''
+    fields = pinFields[key[0]]
+    if old == None or new == None:
+        return [{'pin':key[1], 'site':key[2], 'field':'site', \
+            'old':None if old == None else dict(zip(fields, old)), \
+            'new':None if new == None else dict(zip(fields, new))}]
+    return [{'pin':key[1], 'site':key[2], 'field':fields[i], 'old':old[i], \
+        'new':new[i]} for i in range(0,len(fields)) if old[i] != new[i]]
+
+def group_change(key, old, new):
+    '''Pins added to and removed from a CONF or DFGP group, a pin as many times as
+    it was (e.g. a repeated pin that is only there once now is removed once)'''
+    oldPins = old if old != None else Counter()
+    newPins = new if new != None else Counter()
+    return {'kind':key[0], 'group':' '.join(str(x) for x in key[1:]), \
+        'old':old != None, 'new':new != None, \
+        'added':sorted((newPins - oldPins).elements()), \
+        'removed':sorted((oldPins - newPins).elements())}
+
+def diff_configs(oldFile, newFile):
+    '''Compares two .conf files. Only the keys and values of the old file are kept
+    while the new one is read an entry at a time. Returns:
+        pins: {pin, site, field, old, new} where field is kind, channels, ball,
+            analog, site (a site only in one file) or sites (number of sites)
+        groups: {kind, group, old, new, added, removed} of the CONF and DFGP
+            groups that changed, old and new tell if the group is in the file
+        lines: the other lines only in the old (removed) or new (added) file'''
+    old = dict(keyed_entries(oldFile))
+    oldSites = {}
+    for key in old:
+        if key[0] in pinFields: oldSites[key[1]] = oldSites.get(key[1],0) + 1
+    pins = []; groups = []; added = []; newSites = {}
+    for key, value in keyed_entries(newFile):
+        if key[0] in pinFields: newSites[key[1]] = newSites.get(key[1],0) + 1
+        if key in old:
+            oldValue = old.pop(key)
+            if oldValue == value: continue
+        else: oldValue = None
+        if key[0] in pinFields: pins += pin_changes(key, oldValue, value)
+        elif key[0] == 'line': added.append(key[1])
+        else: groups.append(group_change(key, oldValue, value))
+    removed = []
+    for key, value in old.items(): # only in the old file
+        if key[0] in pinFields: pins += pin_changes(key, value, None)
+        elif key[0] == 'line': removed.append(key[1])
+        else: groups.append(group_change(key, value, None))
+    for pin in oldSites.keys() | newSites.keys():
+        if oldSites.get(pin,0) != newSites.get(pin,0):
+            pins.append({'pin':pin, 'site':None, 'field':'sites', \
+                'old':oldSites.get(pin,0), 'new':newSites.get(pin,0)})
+    fieldOrder = ['sites','site','kind','analog','channels','ball']
+    pins.sort(key=lambda x:(x['pin'], x['site'] if x['site'] else 0, \
+        fieldOrder.index(x['field'])))
+    groups.sort(key=lambda x:(x['kind'], x['group']))
+    return {'old':oldFile, 'new':newFile, 'pins':pins, 'groups':groups, \
+        'lines':{'removed':removed, 'added':added}}
+
+def value_text(value):
+    '''Channels as (12345,12346), a whole site as its fields, - if empty'''
+    if isinstance(value, (tuple, list)): return '(%s)'%','.join(value)
+    if isinstance(value, dict): return ' '.join(value_text(x) for x in value.values())
+    return '-' if value in [None,''] else str(value)
+
+def print_diff(diff):
+    '''Prints the changes of diff_configs, one line for each'''
+    print('Changes from', diff['old'], 'to', diff['new'])
+    print('Pins:', len(set(x['pin'] for x in diff['pins'])), 'changed')
+    for change in diff['pins']:
+        if change['field'] == 'site':
+            print('    %s site %d %s: %s'%(change['pin'], change['site'], \
+                'added' if change['new'] else 'removed', \
+                value_text(change['new'] if change['new'] else change['old'])))
+            continue
+        site = '' if change['site'] == None else ' site %d'%change['site']
+        print('    %s%s %s: %s --> %s'%(change['pin'], site, change['field'], \
+            value_text(change['old']), value_text(change['new'])))
+    print('Groups:', len(diff['groups']), 'changed')
+    for change in diff['groups']:
+        state = '' if change['old'] and change['new'] else \
+            (' (new)' if change['new'] else ' (removed)')
+        print('    %s %s%s'%(change['kind'], change['group'], state))
+        if change['added']: print('        +', ','.join(change['added']))
+        if change['removed']: print('        -', ','.join(change['removed']))
+    lines = diff['lines']
+    print('Lines:', len(lines['removed'])+len(lines['added']), 'changed')
+    for line in lines['removed']: print('    -', line)
+    for line in lines['added']: print('    +', line)
+
+def diff(oldFile, newFile, jsonFile=None, quiet=False):
+    '''Compares two .conf files, prints the changes and writes them to jsonFile.
+    Returns True if the files are the same'''
+    changes = diff_configs(oldFile, newFile)
+    if not quiet and jsonFile != '-': print_diff(changes)
+    if jsonFile == '-': json.dump(changes, sys.stdout, indent=1); print()
+    elif jsonFile != None:
+        with open(jsonFile,'w') as changeFile: json.dump(changes, changeFile, indent=1)
+    return not (changes['pins'] or changes['groups'] or changes['lines']['removed'] \
+        or changes['lines']['added'])
 
-file1 = sys.argv[1]
-file2 = sys.argv[2]
-
-fileOne = open(file1,'r')
-fileTwo = open(file2,'r')
-
-lines1 = fileOne.readlines()
-types = ['DFPN','DFAN''DFPS','DFAN','PSTE','PALS']
-lastInd1 = 0
-l1 = []
-for line in lines1:
-    if any(x in line for x in types) : l1.append(line[:line.find('\n')])
-lines2 = fileTwo.readlines()
-lastInd2 = 0
-l2 = []
-for line in lines2:
-    if any(x in line for x in types) : l2.append(line[:line.find('\n')])
-print('In ',file1,' but not in',file2)
-print('   ','\n    '.join(sorted(list(set(l1)-set(l2)),key=lambda x: x[x.rfind('('):])))
-print('In ',file2,' but not in',file1)
-print('   ','\n    '.join(sorted(list(set(l2)-set(l1)),key=lambda x: x[x.rfind('('):])))
-fileOne.close()
-fileTwo.close()
\ No newline at end of file
+if __name__ == '__main__' :
+    parser = argparse.ArgumentParser(description=\
+        'Compares two .conf files by pin, site and group and lists the changes',\
+        formatter_class = argparse.RawTextHelpFormatter, epilog = 'usage examples:\n'\
+            '    python3 diff.py old.conf new.conf\n'\
+            '    python3 diff.py old.conf new.conf --json changes.json -q')
+    parser.add_argument('-v', '-V', '--version', action='version', \
+        version='Version '+version)
+    parser.add_argument('oldFile', help='.conf file compared from')
+    parser.add_argument('newFile', help='.conf file compared to')
+    parser.add_argument('--json', dest='jsonFile', default=None, \
+        help='also write the changes to this JSON file, - for standard output\n'\
+            'instead of the text')
+    parser.add_argument('-q', '--quiet', dest='quiet', action='store_true', \
+        default=False, help='do not print the changes as text')
+    args = parser.parse_args()
+    try: same = diff(args.oldFile, args.newFile, args.jsonFile, args.quiet)
+    except OSError as error: print('Cannot compare: '+str(error)); sys.exit(2)
+    sys.exit(0 if same else 1)
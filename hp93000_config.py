@@ -0,0 +1,124 @@
+#!/usr/bin/python3
+#################################################################
+#                       hp93000_config                          #
+#################################################################
+#                                                               #
+#   Model of the hp93000 .conf file shared by stil2config,      #
+#   config_to_stil and diff. Parses a .conf into typed entries  #
+#   in one pass over its lines and writes entries back out      #
+#                                                               #
+#################################################################
+# Version 0.0                                                   #
+#################################################################
+#################################################################
+# Version 0.0 is first release                                  #
+#################################################################
+
+version = '0.0'
+
+import re
+
+header = 'hp93000,config,0.1'
+trailer = 'NOOP "7.4.2",,,'
+# order of the definitions in the .conf file
+entryOrder = ['DFPN','DFPS','DFAN','PALS','PSTE','CONF','DFGP']
+# pin definitions, channels are either one channel or (channel,channel,...)
+channelsFormat = r'(\([^)]*\)|[^,(]*)'
+pinFormats = {'DFPN':re.compile('DFPN '+channelsFormat+r',"([^"]*)",\((.*)\)'),
+    'DFPS':re.compile('DFPS '+channelsFormat+r',POS,\((.*)\)'),
+    'PALS':re.compile('PALS ([0-9]+),'+channelsFormat+r',,\((.*)\)'),
+    'DFAN':re.compile(r'DFAN "(.*)231,([0-9]+),([io])","([^"]*)",\((.*)\)')}
+# CONF I,F160,(A,B) and DFGP I,(A,B),(group): mode and pin names
+groupFormat = re.compile(r'[A-Z]{4} ([^,]*),[^(]*\(([^)]*)\)')
+
+class ConfigEntry:
+    '''One line of a .conf file. Pin definitions (DFPN, DFPS, DFAN and PALS) keep
+    their fields and are only turned into text when written, other lines are
+    kept as text (CONF and DFGP lines also get their mode and pin names). Equal
+    entries hash the same so an insertion ordered dict of entries works as a set.
+    key sorts the entries by kind then by the last parentheses (e.g. pin name)'''
+    __slots__ = ('kind', 'channels', 'ball', 'pin', 'site', 'analog', 'text', \
+        'mode', 'pins', 'key')
+
+    def __init__(self, kind, channels=(), ball=None, pin=None, site=1, analog=None,\
+        text=None):
+        self.kind = kind; self.channels = tuple(channels); self.pin = pin
+        self.ball = '' if ball == '""' else ball # a trigger has no ball
+        self.site = site; self.analog = analog; self.text = text
+        self.mode = None; self.pins = ()
+        if text != None and kind in ['CONF','DFGP']:
+            group = groupFormat.match(text)
+            if group: self.mode = group.group(1); self.pins = tuple(group.group(2).split(','))
+        last = '('+pin+')' if text == None else text
+        order = entryOrder.index(kind) if kind in entryOrder else len(entryOrder)
+        self.key = (order, last[last.rfind('('):])
+
+    def __eq__(self, other):
+        if not isinstance(other, ConfigEntry): return NotImplemented
+        return self.fields() == other.fields()
+
+    def __hash__(self): return hash(self.fields())
+
+    def __getstate__(self): return self.fields()
+
+    def __setstate__(self, state): self.__init__(*state)
+
+    def fields(self):
+        return (self.kind, self.channels, self.ball, self.pin, self.site, self.analog,\
+            self.text)
+
+    def channel_string(self):
+        if len(self.channels) == 1: return self.channels[0]
+        return '(%s)'%','.join(self.channels)
+
+    def __str__(self):
+        if self.text != None: return self.text
+        if self.kind == 'DFPN':
+            return 'DFPN %s,"%s",(%s)'%(self.channel_string(), self.ball, self.pin)
+        if self.kind == 'DFPS': return 'DFPS %s,POS,(%s)'%(self.channel_string(),self.pin)
+        if self.kind == 'PALS':
+            return 'PALS %d,%s,,(%s)'%(self.site,self.channel_string(),self.pin)
+        return 'DFAN "%s231,%d,%s","%s",(%s)'%(self.analog+(self.ball,self.pin))
+
+def split_channels(text):
+    '''(12345,12346) --> ('12345','12346'), 12345 --> ('12345',)'''
+    if text.startswith('('): return tuple(text[1:-1].split(','))
+    return (text,)
+
+def parse_entry(text):
+    '''Entry of one .conf line (without the line break)'''
+    kind = text[0:4]
+    fields = pinFormats[kind].fullmatch(text) if kind in pinFormats else None
+    if fields == None: return ConfigEntry(kind, text=text)
+    if kind == 'DFPN':
+        entry = ConfigEntry(kind, split_channels(fields.group(1)), fields.group(2), \
+            fields.group(3))
+    elif kind == 'DFPS':
+        entry = ConfigEntry(kind, split_channels(fields.group(1)), pin=fields.group(2))
+    elif kind == 'PALS':
+        entry = ConfigEntry(kind, split_channels(fields.group(2)), pin=fields.group(3),\
+            site=int(fields.group(1)))
+    else:
+        entry = ConfigEntry(kind, ball=fields.group(4), pin=fields.group(5), \
+            analog=(fields.group(1), int(fields.group(2)), fields.group(3)))
+    # anything written differently than stil2config would is kept as is
+    if str(entry) != text: return ConfigEntry(kind, text=text)
+    return entry
+
+def read_config(fileName):
+    '''Yields the entries of a .conf file one line at a time, skipping the
+    hp93000,config header and empty lines'''
+    with open(fileName,'r') as config:
+        for line in config:
+            line = line.rstrip('\r\n')
+            if line == '' or line.startswith('hp93000,config'): continue
+            yield parse_entry(line)
+
+def write_config(fileName, entries):
+    '''Writes the entries after the hp93000,config header, ending with a NOOP
+    line if the entries do not have one'''
+    lines = [str(entry) for entry in entries]
+    if not any(line.startswith('NOOP') for line in lines): lines.append(trailer)
+    with open(fileName,'w') as config:
+        config.write(header+'\n'+'\n'.join(lines))
+    return lines
@@ -16,20 +16,223 @@
 # Version 0.0 is first release 09.09.2021                       #
 # Version 0.1 adds a case where the channel number is not at    #
 #             the start of the cell                             #
+# Version 0.2 reads the rows straight from the workbook instead #
+#             of converting each sheet to a raw csv first       #
+# Version 0.3 finds name, ball and channel columns of a sheet   #
+#             with a vectorized pre-pass                        #
+# Version 0.4 channels decoded by channel_decoder               #
+# Version 0.5 can convert the sheets in parallel (-j)           #
+# Version 0.6 sheets can be chosen without asking (-s)          #
+# Version 0.7 sheet names and assignments kept in a parse cache #
+# Version 0.8 writes a .jsonl file, the csv is optional (--csv) #
+# Version 0.9 time and memory of each stage can be profiled     #
+# Version 1.0 pandas and openpyxl only imported to read a sheet #
+# Version 1.1 rows classified as they are read, without pandas, #
+#             so only one row of a sheet is in memory           #
+# Version 1.2 each column of a block of rows classified once    #
+#             per distinct value                                #
+# Version 1.3 a ball can be followed by any word boundary       #
 #################################################################
 
-version = '0.1'
+version = '1.3'
 
-import pandas as pd
-from openpyxl import load_workbook
+from channel_decoder import decode_cell
+import channel_decoder
+from assignments_file import pin_record, write_assignments
+from parse_cache import file_digest, cache_key, cache_load, cache_store, \
+    defaultDir, defaultSize
+from stage_profiler import Profiler, noProfile, write_profile
 import argparse
 import os
 import re
 import sys
 import warnings
+from functools import lru_cache
+from itertools import islice, zip_longest
+from concurrent.futures import ProcessPoolExecutor
 warnings.filterwarnings('ignore', category=UserWarning, module='openpyxl')
 
-def netlist_assignments_csv(inputFile,outputDir,productName,excluded):
+# cell formats, see netlist_assignments_csv for examples
+badFormat = re.compile('length|len|coord')
+numFormat = re.compile('[0-9]|MCE')
+ballFormat = re.compile(r'([A-Z]{1,2}[0-9]{1,2})(?=((\Z|\s|\b)|\!|,))')
+nameFormat = re.compile(r'[^a-z ]{2,}\Z')
+cacheEntries = 1<<16 # distinct cell texts whose ball and channel are kept
+blockRows = 4096 # rows classified together, column by column
+
+def cell_text(value):
+    '''Text of a worksheet cell value the way it is shown in excel (whole 
+    numbers stored as floats lose the .0, empty cells are blank)'''
+    if value == None: return ''
+    if isinstance(value, float) and value.is_integer(): return str(int(value))
+    return str(value)
+
+def cell_ball(text):
+    '''Ball number at the start of a cell (e.g. AA11) or None'''
+    pin = ballFormat.match(text)
+    return pin.group(0).strip() if pin else None
+
+def cell_channel(text):
+    '''Channel assignment in a cell (e.g. 12345 or 123-P4) or None'''
+    spec = decode_cell(text)
+    return spec.text if spec else None
+
+def cell_name(text):
+    '''Possible pin name at the end of a cell (capitalized) or None'''
+    possName = nameFormat.search(text)
+    if possName and len(possName.group(0))>1: return re.sub('[()]','',possName.group(0))
+    return None
+
+@lru_cache(maxsize=cacheEntries)
+def cell_assignment(text):
+    '''Ball and channel in a cell text, found once for each distinct text'''
+    return cell_ball(text), cell_channel(text)
+
+def classify_column(column, base, col, nameStarts, lastRows, rowNames, rowCells):
+    '''Classifies one column of a block of rows starting on row base. The distinct
+    values of the column are joined and the header and number tests run once over
+    the joined text, so a column with no header, name, ball or channel in the
+    block costs nothing per row. Only the distinct values with numbers in them
+    can have a ball or channel (MCE=231), and only a name column has its names
+    looked for. Updates the name column starts and the rows of the ignored
+    column headers, and adds the (start, column, name) of the name column and
+    the (column, ball, channel) cells to rowNames and rowCells of each row'''
+    distinct = set(column)
+    if True in distinct or False in distinct: # 1 == True, keep their texts apart
+        column = [cell_text(value) for value in column]; distinct = set(column)
+    texts = {value:cell_text(value) for value in distinct}
+    joined = '\0'.join(texts.values())
+    lastRow = lastRows.get(col)
+    # headers are only looked for down to the ignored column header (included)
+    if lastRow == None and badFormat.search(joined):
+        lastRow = lastRows[col] = base + next(i for i, value in enumerate(column) \
+            if badFormat.search(texts[value]))
+    end = len(column) if lastRow == None else max(min(lastRow-base+1, len(column)), 0)
+    if col not in nameStarts and 'name' in joined.lower():
+        start = next((i for i, value in enumerate(column[:end]) \
+            if 'name' in texts[value].lower()), None)
+        if start != None: nameStarts[col] = base + start
+    start = nameStarts.get(col)
+    if start != None and start-base+1 < len(column):
+        names = {}
+        for value, text in texts.items():
+            name = cell_name(text)
+            if name != None: names[value] = name
+        for i in range(max(start-base+1, 0), len(column)):
+            name = names.get(column[i])
+            if name != None: rowNames[i].append((start, col, name))
+    if end == 0 or not numFormat.search(joined): return
+    cells = {}
+    for value, text in texts.items():
+        if not numFormat.search(text): continue
+        ball, channel = cell_assignment(text)
+        if ball != None or channel != None: cells[value] = (col, ball, channel)
+    if cells:
+        for i in range(0, end):
+            cell = cells.get(column[i])
+            if cell: rowCells[i].append(cell)
+
+def classify_rows(rows):
+    '''Streams the rows of a worksheet (cell values) and yields, one row at a time,
+    the pin names of the name columns found above the row, as sorted
+    (row, column, name) triples, and the list of (column, ball, channel) cells of
+    the row that have a ball or a channel in them. A name column starts on the row
+    of its header (with "name" in it), an ignored column (header with
+    length/len/coord in it) is not used below its header. The rows are read in
+    blocks of blockRows and each column of a block is classified at once (see
+    classify_column). Only the state of each column and one block are kept so
+    memory does not grow with the sheet'''
+    nameStarts = {}; lastRows = {}
+    rows = iter(rows); base = 0
+    while True:
+        block = list(islice(rows, blockRows))
+        if len(block) == 0: return
+        rowNames = [[] for values in block]; rowCells = [[] for values in block]
+        for col, column in enumerate(zip_longest(*block)):
+            classify_column(column, base, col, nameStarts, lastRows, rowNames, rowCells)
+        for names, cells in zip(rowNames, rowCells):
+            names.sort()
+            yield names, cells
+        base += len(block)
+
+def sheet_rows(worksheet):
+    '''Rows of a worksheet as tuples of cell values, read one at a time'''
+    return worksheet.iter_rows(values_only=True)
+
+def parse_rows(rows):
+    '''Finds the pin name, channel number(s), and ball number of every row of a 
+    sheet. Returns a list of (row number, pin name, ball number, assignments) for
+    the rows with a pin name, where assignments are the (channel, ball) pairs in 
+    the order they were found in the row, and the number of rows read'''
+    records = []
+    rowNum = 0
+    for names, cells in classify_rows(rows):
+        rowNum += 1
+        pinName = None; channelNum = None
+        pinNum = '""'
+        nameIdx = None
+        for start, col, name in names: # name columns found above this row
+            if name != None:
+                pinName = name; nameIdx = col; break
+        if not pinName: continue
+        assignments = []
+        for col, pin, channel in cells :
+            updatedC = False; updatedP = False
+            if pinNum == '""' and col != nameIdx and pin:
+                pinNum = pin
+                updatedP = True
+            if channel:
+                channelNum = channel
+                updatedC = True
+            # if its a new set of assignments   
+            if pinName and pinNum and channelNum and (updatedC or updatedP) and pinName!= pinNum: 
+                assignments.append((channelNum, pinNum))
+        records.append((rowNum, pinName, pinNum, assignments))
+    return records, rowNum
+
+def read_sheet(inputFile, sheet):
+    '''Opens the workbook and parses the rows of one sheet (see parse_rows). Used
+    to convert sheets in separate processes'''
+    from openpyxl import load_workbook
+    workbook = load_workbook(filename = inputFile,data_only=True, read_only=True)
+    try: return parse_rows(sheet_rows(workbook[sheet]))[0]
+    finally: workbook.close()
+
+def add_sheet(sheet, records, pNames, ballMap):
+    '''Adds the parsed rows of a sheet to the pin name assignments and the ball
+    map, along with the (sheet:row) location of each pin'''
+    for rowNum, pinName, pinNum, assignments in records:
+        for channelNum, pin in assignments:
+            if pinName in pNames.keys() :
+                if channelNum in pNames[pinName] and not pin in pNames[pinName]:
+                    pNames[pinName] += [pin]
+                if pin in pNames[pinName] and not channelNum in pNames[pinName]:
+                    pNames[pinName].insert(1,channelNum)
+                elif not channelNum in pNames[pinName] and not pin in pNames[pinName]: 
+                    pNames[pinName] += [channelNum, pin]
+            else: pNames[pinName] = [channelNum, pin]
+            if not pin in ballMap.keys():
+                ballMap[pin] = pinName + '\n' + channelNum
+            elif not channelNum in ballMap[pin]:
+                ballMap[pin] += ',\n' + channelNum
+        if pinNum and pinName and not pinNum in ballMap.keys():
+            ballMap[pinNum] = pinName 
+        if pinName in pNames.keys() :
+            pNames[pinName] += ['('+sheet+':Row '+str(rowNum)+')']
+
+def select_sheets(visibleSheets, sheets):
+    '''Names of the visible worksheets that are equal to or fully match (as a 
+    regular expression) any of the given sheet selectors, in workbook order'''
+    names = []
+    for name in visibleSheets:
+        for selector in sheets:
+            try: matched = re.fullmatch(selector, name) != None
+            except re.error: matched = False
+            if name == selector or matched: names.append(name); break
+    return names
+
+def netlist_assignments_csv(inputFile,outputDir,productName,excluded,jobs=1,\
+    sheets=None,cacheDir=None,cacheSize=defaultSize,writeCSV=False,profiler=noProfile):
     '''Searches an excel file for all the tester channel assignments for every net 
     name. The following rules must be followed in formatting the excel sheet:
         1. Only one net name/pin name per row
@@ -52,6 +255,13 @@ def netlist_assignments_csv(inputFile,outputDir,productName,excluded):
                 i. any of the above proceeded by CH/TC
         note: Analog pins are defined by using the 231A+ format
         only the the letters will be translated and not the 3 numbers before 
+    With jobs other than 1 the chosen sheets are converted in a pool of that many 
+    processes (0 = all cores). The sheets are asked for unless a list of sheet 
+    names or regular expressions is given as sheets. With a cacheDir the sheet
+    names and converted assignments are kept there (see parse_cache) and the
+    workbook is not opened again until its contents change. The assignments are
+    written to a .jsonl file (see assignments_file), and also to a csv if writeCSV.
+    The time and memory of each stage are recorded in profiler (see stage_profiler)
     '''
     # check inputs/outputs
     inputFile = os.path.realpath(re.sub('["\']','',inputFile))
@@ -69,175 +279,125 @@ def netlist_assignments_csv(inputFile,outputDir,productName,excluded):
 
     # get everything up until the first period or underscore of file name
     if productName == None: 
-        productName = re.match('^(.*?)(?=(\.|_))',os.path.basename(inputFile)).group(0)
+        productName = re.match(r'^(.*?)(?=(\.|_))',os.path.basename(inputFile)).group(0)
     productName = productName.replace(' ','_')
 
     # list out excel worksheets to select from
-    try: 
-        print('Loading workbook...',end='\r')
-        workbook = load_workbook(filename = inputFile,data_only=True, read_only=True)
-    except KeyboardInterrupt:
-        return print('\nKeyboard Interrupt: Process Killed')
-    except: return print(os.path.basename(inputFile) + ' is not a valid excel file')
-    sheetsNames = workbook.sheetnames
-    visibleSheets = []
-    # get all the non hidden worksheets
-    for sheet in sheetsNames:
-        if workbook[sheet].sheet_state != 'hidden' : 
-            visibleSheets.append(sheet)
-    workbook.close()
-    print(os.path.basename(inputFile)+'         ')
-    print('Select worksheet names by typing corresponding numbers separated by spaces')
-    i=0
-    for sheetname in visibleSheets:
-        print('    ' + str(i) + '. ' + sheetname)
-        i += 1
-    print('    ' + str(i) + '. ALL SHEETS')
-    # get the user input
-    numbers = input('Selected Numbers: ')
-    numbers = re.findall(r'\d+',numbers)
-    names= []; sheetNums = []
-    for i in range(0,len(numbers)):
-        try : 
-            num = int(numbers[i].strip())
-            if num == len(visibleSheets) : 
-                names = visibleSheets
-                for name in names:
-                    if sheetsNames.index(name) not in sheetNums: 
-                        sheetNums.append(sheetsNames.index(name))
-                break
-            if not (num >= 0 and num < len(visibleSheets)): 
-                raise Exception
-        except: print('Please enter only integers in above range'); return
-        names.append(visibleSheets[num])
-        sheetNums.append(sheetsNames.index(visibleSheets[num]))
-    # pull chosen sheets from excel into raw csv files
-    sheets = []
+    profiler.stage('workbook load')
+    workbook = None
+    digest = file_digest(inputFile) if cacheDir != None else None
+    sheetsKey = cache_key('sheets', digest, version)
+    cached = cache_load(cacheDir, sheetsKey)
+    if cached != None: sheetsNames, visibleSheets = cached
+    else:
+        from openpyxl import load_workbook
+        try: 
+            print('Loading workbook...',end='\r')
+            workbook = load_workbook(filename = inputFile,data_only=True, read_only=True)
+        except KeyboardInterrupt:
+            return print('\nKeyboard Interrupt: Process Killed')
+        except: return print(os.path.basename(inputFile) + ' is not a valid excel file')
+        sheetsNames = workbook.sheetnames
+        visibleSheets = []
+        # get all the non hidden worksheets
+        for sheet in sheetsNames:
+            if workbook[sheet].sheet_state != 'hidden' : 
+                visibleSheets.append(sheet)
+        cache_store(cacheDir, sheetsKey, (sheetsNames, visibleSheets), cacheSize)
+    if sheets != None: # chosen by name or regular expression
+        names = select_sheets(visibleSheets, sheets)
+        if len(names) == 0:
+            if workbook: workbook.close()
+            return print('No worksheets match '+' '.join(sheets))
+        sheetNums = [sheetsNames.index(name) for name in names]
+    else:
+        profiler.stage('sheet selection') # waiting for the user
+        print(os.path.basename(inputFile)+'         ')
+        print('Select worksheet names by typing corresponding numbers separated by spaces')
+        i=0
+        for sheetname in visibleSheets:
+            print('    ' + str(i) + '. ' + sheetname)
+            i += 1
+        print('    ' + str(i) + '. ALL SHEETS')
+        # get the user input
+        numbers = input('Selected Numbers: ')
+        numbers = re.findall(r'\d+',numbers)
+        names= []; sheetNums = []
+        for i in range(0,len(numbers)):
+            try : 
+                num = int(numbers[i].strip())
+                if num == len(visibleSheets) : 
+                    names = visibleSheets
+                    for name in names:
+                        if sheetsNames.index(name) not in sheetNums: 
+                            sheetNums.append(sheetsNames.index(name))
+                    break
+                if not (num >= 0 and num < len(visibleSheets)): 
+                    raise Exception
+            except: 
+                if workbook: workbook.close()
+                return print('Please enter only integers in above range')
+            names.append(visibleSheets[num])
+            sheetNums.append(sheetsNames.index(visibleSheets[num]))
     print('Converting worksheets...', end='\r')
-    try:
-        for numb in sheetNums: 
-            read_file = None
-            try: # for older version on linux "sheetname" instead of "sheet_name"
-                read_file = pd.read_excel(inputFile,sheetname=numb,header=None,index_col=None)
-            except:
-                read_file = pd.read_excel(inputFile,sheet_name=numb,header=None,index_col=None)
-            fileName = sheetsNames[numb] +'_raw.csv'
-            outputFileRaw = os.path.join(outputDir,fileName)
-            read_file.to_csv(outputFileRaw,sep=';',mode='w')
-            sheets.append(outputFileRaw)
+    profiler.stage('sheet conversion')
+    chosen = [sheetsNames[numb] for numb in sheetNums]
+    namesKey = cache_key('netlist', digest, version, channel_decoder.version, chosen,\
+        excluded)
+    cached = cache_load(cacheDir, namesKey)
+    if cached != None: 
+        if workbook: workbook.close()
+        pNames, ballMap = cached
+    else:
+        # read the chosen sheets row by row, in parallel if asked for
+        if jobs != 1 and len(chosen) > 1:
+            if workbook: workbook.close()
+            with ProcessPoolExecutor(max_workers=(jobs if jobs > 0 else None)) as pool:
+                sheetRecords = list(pool.map(read_sheet, [inputFile]*len(chosen), chosen))
+        else:
+            if workbook == None:
+                from openpyxl import load_workbook
+                workbook = load_workbook(filename = inputFile,data_only=True, read_only=True)
+            sheetRecords = []
+            for sheet in chosen:
+                profiler.stage('sheet conversion')
+                records, rows = parse_rows(sheet_rows(workbook[sheet]))
+                sheetRecords.append(records); profiler.count('rows', rows)
+            workbook.close()
+        # merge the sheets in the order they were chosen
+        profiler.stage('sheet merging')
         pNames = {}
-    except KeyboardInterrupt:
-        return print('\nKeyboard Interrupt: Process Killed')
-    ballMap = {}
-    for sheet in sheets :
-        readFile = open(sheet, 'r') 
-        contents = readFile.readlines()
-        nameIdxs = []
-        badColNames = ['length', 'len','coord']
-        badCols = []
-        # try to get pin name, channel number(s), and ball number from line 
-        for line in contents:
-            pinName = None; channelNum = None
-            pinNum = '""'
-            nameIdx = None
-            #change all commas in line to ! and change separators to commas
-            line = line.replace(',','!').replace(';',',')
-            data = line.split(',')
-            if pinName == None :
-                for col in nameIdxs:
-                    possName = re.search('[^a-z ]{2,}\Z',data[col])
-                    if possName and len(possName.group(0))>1: 
-                        pinName = possName.group(0); nameIdx = col; 
-                        pinName = re.sub('[()]','',pinName); break
-            for entry in data :
-                updatedC = False; updatedP = False
-                ind = data.index(entry)
-                if ind in badCols : continue
-                if any(x in entry for x in badColNames): 
-                    if not ind in badCols: badCols.append(ind)
-                if 'name' in entry.lower() : 
-                    if not ind in nameIdxs: nameIdxs.append(ind)
-                if pinNum == '""' and ind != nameIdx:
-                    # pin number (1-3 upper case letters followed by 1-3#s) AA11
-                    pin = re.match('([A-Z]{1,2}[0-9]{1,2})(?=((\Z|\s|\b)|\!))',entry)
-                    if pin: 
-                        pinNum = pin.group(0).strip()
-                        updatedP = True
-                try: 
-                    # get rid of letters before channel
-                    entry = re.sub('TC|CH','', entry).replace('PF','P')
-                    entry = entry.replace('MCE', '231')
-                    # channel formats like PF13-PF16_DPS32_425 
-                    entry =  re.sub('_.*_','_', entry)
-                    if '_'in entry and re.search('[0-9]{3}',entry): 
-                        entry = entry[entry.find('_')+1:]+'-'+entry[:entry.find('_')]
-                    # 123.45 format
-                    if re.search('[0-9]{3}\.[0-9]{2}',entry) != None:
-                        entry = entry.replace('.','')
-                except : pass
-                # 12345 or 12345-6
-                channel = re.match('([0-9]{5}|([0-9]{5}-[0-9]{1,2}))(\Z|\s|\b)',entry)
-                if channel: 
-                    channelNum = channel.group(0).strip()
-                    updatedC = True
-                else:
-                    #123-P4 or 123-P45 or 123-P4-P5
-                    channel = re.match('[0-9]{3}-P[0-9]{1,2}(-P[0-9]{1,2})?(\Z|\s|\b)',entry)
-                    if channel: 
-                        channelNum = channel.group(0).strip()
-                        updatedC = True
-                    else:
-                        #123A+ or 123HH- or CT1
-                        channel = re.match('[0-9]{3}(([A-Z]{1,2}[+|-])|CT1|CT2)(\Z|\s|\b)',entry)
-                        if channel: 
-                            channelNum = channel.group(0).strip()
-                            updatedC = True
-                        else:
-                             # *12345*
-                            channel = re.search('[^0-9][0-9]{5}[^0-9]',entry)
-                            if channel: 
-                                channelNum = channel.group(0)[1:6]
-                                updatedC = True
-                
-                # if its a new set of assignments   
-                if pinName and pinNum and channelNum and (updatedC or updatedP) and pinName!= pinNum: 
-                    if pinName in pNames.keys() :
-                        if channelNum in pNames[pinName] and not pinNum in pNames[pinName]:
-                            pNames[pinName] += [pinNum]
-                        if pinNum in pNames[pinName] and not channelNum in pNames[pinName]:
-                            pNames[pinName].insert(1,channelNum)
-                        elif not channelNum in pNames[pinName] and not pinNum in pNames[pinName]: 
-                            pNames[pinName] += [channelNum, pinNum]
-                    else: pNames[pinName] = [channelNum, pinNum]
-                    if not pinNum in ballMap.keys():
-                        ballMap[pinNum] = pinName + '\n' + channelNum
-                    elif not channelNum in ballMap[pinNum]:
-                        ballMap[pinNum] += ',\n' + channelNum
-            if pinNum and pinName and not pinNum in ballMap.keys():
-                ballMap[pinNum] = pinName 
-            if pinName in pNames.keys() :
-                row = str(int(data[0])+1)
-                pNames[pinName] += \
-                ['('+os.path.basename(sheet[:sheet.rfind('_')])+':Row '+row+')']
-        readFile.close()
-        os.remove(sheet)
+        ballMap = {}
+        for sheet, records in zip(chosen, sheetRecords):
+            add_sheet(sheet, records, pNames, ballMap)
+        cache_store(cacheDir, namesKey, (pNames, ballMap), cacheSize)
     if len(pNames.keys()) == 0 : return print('Did not find any valid assignments.'\
         ' Check that net name column has the word "name" in the column header.')
-    outputFile = os.path.join(outputDir,productName+'_netlist_assignments.csv')
-    with open(outputFile,'w') as writeFile:
-        chHeader = 'Channel Number'
-        testLine = pNames[list(pNames.keys())[0]]
-        for i in range(0,len(testLine)):
-            if re.search('[A-OQ-Z]',testLine[i]): break
-            if i == 1 : chHeader = 'Channel Site-1,Channel Site-2'
-            elif i > 1: chHeader += ',Channel Site-'+str(i+1)
-            
-        writeFile.write('Pin Name,%s,Ball Number(s),(Sheet name: Row #)\n'%chHeader)
-        for key in pNames:
-            if key in excluded: continue
-            writeFile.write(key+','+','.join(pNames[key])+'\n')
-        writeFile.write('##For Ball Map##\n')
-        writeFile.write(str(ballMap)+'\n')
+    # sites are the channels the first pin has before its ball
+    profiler.stage('assignments writing')
+    profiler.count('sheets', len(chosen)); profiler.count('pins', len(pNames))
+    profiler.count('balls', len(ballMap))
+    sites = 1
+    testLine = pNames[list(pNames.keys())[0]]
+    for i in range(0,len(testLine)):
+        if re.search('[A-OQ-Z]',testLine[i]): break
+        if i > 0: sites = i+1
+    outputFile = os.path.join(outputDir,productName+'_netlist_assignments.jsonl')
+    records = [pin_record(key, pNames[key]) for key in pNames if not key in excluded]
+    records += [{'type':'ball', 'ball':ball, 'label':ballMap[ball]} for ball in ballMap]
+    write_assignments(outputFile, 'netlist_assignments', records, product=productName,\
+        sites=sites)
+    if writeCSV: # human readable version
+        with open(outputFile[:outputFile.rfind('.')]+'.csv','w') as writeFile:
+            chHeader = 'Channel Number'
+            if sites > 1: 
+                chHeader = ','.join('Channel Site-'+str(i) for i in range(1,sites+1))
+            writeFile.write('Pin Name,%s,Ball Number(s),(Sheet name: Row #)\n'%chHeader)
+            for key in pNames:
+                if key in excluded: continue
+                writeFile.write(key+','+','.join(pNames[key])+'\n')
+            writeFile.write('##For Ball Map##\n')
+            writeFile.write(str(ballMap)+'\n')
     print('Done!                                   ')
     return [pNames,os.path.abspath(outputFile),ballMap]
 
@@ -278,10 +438,30 @@ if __name__ == '__main__' :
         help='name of product and product version (e.g. fulda_B0)')
     parser.add_argument('-x', '--exclude', nargs='+',dest='exclude', default=[], \
         help='pin names to be excluded/ignored (e.g NC)')
+    parser.add_argument('-j', '--jobs', dest='jobs', type=int, default=1, \
+        help='number of processes converting sheets. 0 uses all cores. DEFAULT 1')
+    parser.add_argument('-s', '--sheets', nargs='+', dest='sheets', default=None, \
+        help='names or regular expressions of the sheets to convert instead of\n'\
+            'asking (e.g. Site.* to get all sheets starting with Site)')
+    parser.add_argument('--cache', dest='cacheDir', default=defaultDir, \
+        help='folder of the parse cache. DEFAULT $STIL2CONFIG_CACHE or\n'\
+            '~/.cache/stil2config')
+    parser.add_argument('--no-cache', dest='cacheDir', action='store_const', \
+        const=None, help='always convert the workbook, do not use the parse cache')
+    parser.add_argument('--cache-size', dest='cacheSize', type=int, default=defaultSize,\
+        help='size of the parse cache in MB. DEFAULT %d' % defaultSize)
+    parser.add_argument('--csv', dest='csv', action='store_true', default=False, \
+        help='also write the assignments to a human readable csv')
+    parser.add_argument('--profile', dest='profile', default=None, \
+        help='write the time, CPU time and peak memory of each stage and the\n'\
+            'number of rows, pins and balls read to this JSON file')
     args = parser.parse_args()
     if args.version: print('Version '+version); sys.exit()
+    profiler = Profiler(args.profile != None)
     try:
-        netlist_assignments_csv(args.inputFile,args.outputDir,args.name,args.exclude)
+        netlist_assignments_csv(args.inputFile,args.outputDir,args.name,args.exclude,\
+            args.jobs,args.sheets,args.cacheDir,args.cacheSize,args.csv,profiler)
     except KeyboardInterrupt:
         print('\n Keyboard Interrupt: Process Killed')
     except: print('Cannot convert given file')
+    write_profile(profiler, args.profile, 'netlist_assignments_csv', version)
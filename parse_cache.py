@@ -0,0 +1,134 @@
+#!/usr/bin/python3
+#################################################################
+#                        parse_cache                            #
+#################################################################
+#                                                               #
+#   On disk cache of parsed netlists and .stil files. Entries   #
+#   are keyed by a hash of the input file contents, the parser  #
+#   version and the options used, and the least recently used   #
+#   entries are removed when the cache gets too big             #
+#                                                               #
+#################################################################
+# Version 0.3                                                   #
+#################################################################
+#################################################################
+# Version 0.0 is first release                                  #
+# Version 0.1 entries can also be kept in memory between runs   #
+# Version 0.2 digests of files that did not change are kept too #
+# Version 0.3 folder only scanned when it may be over its size  #
+#################################################################
+
+version = '0.3'
+
+import os
+import hashlib
+import pickle
+import tempfile
+
+defaultDir = os.environ.get('STIL2CONFIG_CACHE', \
+    os.path.join(os.path.expanduser('~'), '.cache', 'stil2config'))
+defaultSize = 512 # MB
+entryExt = '.pkl'
+# pickled entries of this process by key, None unless keep_in_memory was called
+memoryEntries = None
+usedKeys = set() # keys and file names of digests used since forget_unused
+# file name to (modified time, size, sha256), also only kept after keep_in_memory
+memoryDigests = {}
+# bytes of entries in each cache folder when this process last scanned it, plus
+# the entries it stored since
+folderSizes = {}
+
+def file_digest(inputFile, chunkSize=1<<20):
+    '''sha256 of the contents of a file. While entries are kept in memory the
+    file is only read again if its modified time or size changed, the same
+    check stil2config --watch uses to see that a file changed'''
+    if memoryEntries != None:
+        stat = os.stat(inputFile)
+        fileName = os.path.abspath(inputFile)
+        known = memoryDigests.get(fileName)
+        if known != None and known[:2] == (stat.st_mtime_ns, stat.st_size):
+            usedKeys.add(fileName); return known[2]
+    digest = hashlib.sha256()
+    with open(inputFile,'rb') as readFile:
+        for chunk in iter(lambda: readFile.read(chunkSize), b''):
+            digest.update(chunk)
+    if memoryEntries != None:
+        memoryDigests[fileName] = (stat.st_mtime_ns, stat.st_size, digest.hexdigest())
+        usedKeys.add(fileName)
+    return digest.hexdigest()
+
+def cache_key(*parts):
+    '''Key of a cache entry made from file digests, parser versions and options
+    (anything with a stable repr, e.g. strings, numbers and lists of them)'''
+    return hashlib.sha256(repr((version,)+parts).encode()).hexdigest()
+
+def keep_in_memory():
+    '''Also keeps the entries this process loads and stores in memory, so a long
+    running process (e.g. stil2config --watch) gets the unchanged netlists and
+    .stil files without reading the cache folder. They are kept pickled so the
+    values loaded are never the ones changed by an earlier run'''
+    global memoryEntries
+    if memoryEntries == None: memoryEntries = {}
+
+def forget_unused():
+    '''Drops the in memory entries that were not loaded or stored since the last
+    call, e.g. those of an input file that has since changed, and the digests of
+    files that were not read (e.g. removed)'''
+    for key in set(memoryEntries if memoryEntries else []) - usedKeys:
+        del memoryEntries[key]
+    for fileName in set(memoryDigests) - usedKeys: del memoryDigests[fileName]
+    usedKeys.clear()
+
+def cache_load(cacheDir, key):
+    '''Value stored under key or None if there is none (or it cannot be read).
+    Marks the entry as recently used'''
+    if cacheDir == None: return None
+    if memoryEntries != None and key in memoryEntries:
+        usedKeys.add(key)
+        return pickle.loads(memoryEntries[key])
+    entryFile = os.path.join(cacheDir, key+entryExt)
+    try:
+        with open(entryFile,'rb') as readFile: data = readFile.read()
+        value = pickle.loads(data)
+        os.utime(entryFile)
+    except: return None
+    if memoryEntries != None: memoryEntries[key] = data; usedKeys.add(key)
+    return value
+
+def cache_store(cacheDir, key, value, maxSize=defaultSize):
+    '''Stores value under key then removes least recently used entries until the
+    cache is at most maxSize MB. The folder is only scanned for that on the first
+    store of this process and when the entries stored since would take it over
+    maxSize (entries stored by other processes are counted at the next scan).
+    Entries are written to a temporary file first so processes sharing the cache
+    never read half written entries'''
+    if cacheDir == None: return
+    try:
+        data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        if memoryEntries != None: memoryEntries[key] = data; usedKeys.add(key)
+        os.makedirs(cacheDir, exist_ok=True)
+        handle, tempFile = tempfile.mkstemp(dir=cacheDir, suffix='.tmp')
+        with os.fdopen(handle,'wb') as writeFile: writeFile.write(data)
+        os.replace(tempFile, os.path.join(cacheDir, key+entryExt))
+    except: return
+    folder = os.path.abspath(cacheDir)
+    size = folderSizes.get(folder)
+    if size == None or size+len(data) > maxSize*(1<<20): evict(cacheDir, maxSize)
+    else: folderSizes[folder] = size+len(data)
+
+def evict(cacheDir, maxSize=defaultSize):
+    '''Removes the least recently used entries until the cache is at most
+    maxSize MB and notes the size of what is left'''
+    entries = []
+    for name in os.listdir(cacheDir):
+        if not name.endswith(entryExt): continue
+        try: stat = os.stat(os.path.join(cacheDir, name))
+        except OSError: continue # removed by another process
+        entries.append((stat.st_mtime, stat.st_size, name))
+    total = sum(entry[1] for entry in entries)
+    for mtime, size, name in sorted(entries):
+        if total <= maxSize*(1<<20): break
+        try: os.remove(os.path.join(cacheDir, name))
+        except OSError: pass
+        total -= size
+    folderSizes[os.path.abspath(cacheDir)] = total
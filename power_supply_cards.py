@@ -0,0 +1,61 @@
+#!/usr/bin/python3
+#################################################################
+#                     power_supply_cards                        #
+#################################################################
+#                                                               #
+#   Reads the tester cards and their ranges of power supply     #
+#   channels from power_supply_cards.json (new cards only need  #
+#   an entry there) and finds which channels are power supplies #
+#   with a sorted interval index                                #
+#                                                               #
+#################################################################
+# Version 0.1                                                   #
+#################################################################
+#################################################################
+# Version 0.0 is first release                                  #
+# Version 0.1 one bisect lookup, the numpy batch lookup removed #
+#################################################################
+
+version = '0.1'
+
+import os
+import json
+import bisect
+
+# "always": the card is in every tester, otherwise it has to be chosen (-c)
+cardFile = os.path.join(os.path.dirname(os.path.abspath(__file__)), \
+    'power_supply_cards.json')
+
+def load_cards(fileName=cardFile):
+    '''Reads the card definitions into a dictionary of card name to whether it
+    is always used and its channel ranges as (first, last) channel numbers'''
+    with open(fileName,'r') as readFile: definitions = json.load(readFile)
+    cards = {}
+    for name in definitions:
+        ranges = []
+        for channels in definitions[name]['ranges']: # e.g. "31701-32416"
+            low, high = channels.split('-')
+            ranges.append((int(low), int(high)))
+        cards[name] = {'always':definitions[name].get('always',False), 'ranges':ranges}
+    return cards
+
+def optional_cards(cards):
+    '''Names of the cards that have to be chosen'''
+    return [name for name in cards if not cards[name]['always']]
+
+def card_index(cards, selected):
+    '''Sorted and merged power supply channel ranges of the chosen cards and the
+    cards that are always used, as lists of first and last channels'''
+    ranges = sorted(channels for name in cards if cards[name]['always'] or \
+        name in selected for channels in cards[name]['ranges'])
+    starts = []; ends = []
+    for low, high in ranges:
+        if len(ends) > 0 and low <= ends[-1]+1: ends[-1] = max(ends[-1], high)
+        else: starts.append(low); ends.append(high)
+    return starts, ends
+
+def is_power_supply(index, channel):
+    '''True if the channel number is in one of the ranges of the index'''
+    starts, ends = index
+    i = bisect.bisect_right(starts, channel)-1
+    return i >= 0 and channel <= ends[i]
@@ -0,0 +1,96 @@
+#!/usr/bin/python3
+#################################################################
+#                       stage_profiler                          #
+#################################################################
+#                                                               #
+#   Records the wall time, CPU time and peak memory of each     #
+#   named stage of a run (e.g. workbook load, STIL parsing)     #
+#   and counts of what was read, and writes them to a JSON      #
+#   report that can be collected across runs (--profile)        #
+#                                                               #
+#################################################################
+# Version 0.0                                                   #
+#################################################################
+#################################################################
+# Version 0.0 is first release                                  #
+#################################################################
+
+version = '0.0'
+
+import os
+import sys
+import json
+import time
+import platform
+import tracemalloc
+
+class Profiler:
+    '''Stages follow each other: starting a stage ends the one before it, so every
+    moment of the run is in exactly one stage and functions that are given the
+    profiler carry on the stages of their caller. A stage started more than once
+    adds up its times. Peak memory is what tracemalloc traced in this process, CPU
+    time of processes that ended during a stage (e.g. a pool of jobs) is kept
+    apart as childCpu. A profiler that is not enabled does nothing'''
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.stages = {}; self.counts = {}; self.current = None
+        if not enabled: return
+        self.started = time.strftime('%Y-%m-%dT%H:%M:%S')
+        if not tracemalloc.is_tracing(): tracemalloc.start()
+        self.start = self.clocks()
+        self.peak = 0
+
+    def clocks(self):
+        times = os.times()
+        return (time.perf_counter(), time.process_time(), \
+            times.children_user+times.children_system)
+
+    def stage(self, name):
+        '''Ends the current stage and starts name (None just ends it)'''
+        if not self.enabled: return
+        now = self.clocks()
+        if self.current != None:
+            peak = tracemalloc.get_traced_memory()[1]; self.peak = max(self.peak, peak)
+            stage = self.stages.setdefault(self.current, \
+                {'calls':0, 'wall':0.0, 'cpu':0.0, 'childCpu':0.0, 'peakMB':0.0})
+            stage['calls'] += 1
+            for i, key in enumerate(['wall','cpu','childCpu']):
+                stage[key] += now[i]-self.stageStart[i]
+            stage['peakMB'] = max(stage['peakMB'], peak/(1<<20))
+        tracemalloc.reset_peak()
+        self.current = name; self.stageStart = now
+
+    def count(self, name, number):
+        '''Adds number to the count called name (e.g. pins)'''
+        if self.enabled: self.counts[name] = self.counts.get(name,0) + number
+
+    def report(self, **info):
+        '''Ends the current stage and returns the report, with info (e.g. script
+        and arguments) added at the top'''
+        self.stage(None)
+        now = self.clocks()
+        totals = {key:round(now[i]-self.start[i],6) for i, key in \
+            enumerate(['wall','cpu','childCpu'])}
+        stages = [dict(name=name, **{key:round(value,6) for key, value in \
+            self.stages[name].items()}) for name in self.stages]
+        return dict(info, started=self.started, host=platform.node(), \
+            python=platform.python_version(), peakMB=round(self.peak/(1<<20),6), \
+            **totals, stages=stages, counts=self.counts)
+
+    def write(self, fileName, **info):
+        '''Writes the report (see report) to a JSON file'''
+        if not self.enabled: return
+        report = self.report(**info)
+        tracemalloc.stop()
+        try:
+            with open(fileName,'w') as reportFile: json.dump(report, reportFile, indent=1)
+        except OSError: return print('Cannot write profile report to '+fileName)
+        print('Profile report location: ', os.path.relpath(fileName))
+
+noProfile = Profiler(False)
+
+def write_profile(profiler, fileName, script, scriptVersion):
+    '''Writes the report of a script run from the command line'''
+    profiler.write(fileName, script=script, version=scriptVersion, \
+        arguments=sys.argv[1:])
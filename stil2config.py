@@ -15,57 +15,81 @@
 #################################################################
 # Version 0.0 is first release 09.10.2021                       #
 # Version 0.1 updated error logging with locations in excel     #
+# Version 0.2 .stil files can be read in parallel (-j)          #
+# Version 0.3 channels decoded by channel_decoder               #
+# Version 0.4 netlist sheets can be converted in parallel too   #
+# Version 0.5 netlist sheets can be chosen without asking (-s)  #
+# Version 0.6 parsed netlists and .stil files are cached        #
+# Version 0.7 reads the .jsonl assignments, csvs optional       #
+# Version 0.8 incremental mode only recomputes changed pins     #
+# Version 0.9 power supply card ranges read from a data file    #
+# Version 1.0 transfer names only compared within buckets       #
+# Version 1.1 groups renamed in one pass over their pins        #
+# Version 1.2 ball map streamed to a write only workbook        #
+# Version 1.3 time and memory of each stage can be profiled     #
+# Version 1.4 openpyxl and pandas only imported when needed     #
+# Version 1.5 can watch the --io folder and convert on changes  #
+# Version 1.6 .jsonl pin locations logged the same as the csv's #
+# Version 1.7 --watch profiles each conversion on its own       #
+# Version 1.8 channels that are not 5 numbers are logged        #
 #################################################################
 
-version = '0.1'
+version = '1.8'
 
 import argparse
 import sys
 import os
 import re
 import glob
-import openpyxl
 import ast
-from openpyxl.utils.cell import get_column_letter, column_index_from_string
-from openpyxl.styles import Alignment, PatternFill, Font, Border, Side
+import pickle
+import time
+from copy import copy
 from netlist_assignments_csv import netlist_assignments_csv
-from stil_assignments_csv import stil_assignments_csv
+from stil_assignments_csv import stil_assignments_csv, definition_line
+from assignments_file import read_assignments, pin_record, ballFormat
+import assignments_file
+from channel_decoder import decode_channel, channel_names
+import channel_decoder
+from parse_cache import defaultDir, defaultSize, keep_in_memory, forget_unused
+from hp93000_config import ConfigEntry, parse_entry, write_config
+from transfer_names import transfer_names
+from stage_profiler import Profiler, noProfile, write_profile
+from watch_inputs import watch, defaultSettle
+from power_supply_cards import cardFile, load_cards, optional_cards, card_index, \
+    is_power_supply
 
-#weird but given conversions to mode value in pinconfig (value is index+1)
-conversionTable = ['A+','B+','C+','D+','A-','B-','C-','D-','E+','F+','G+','H+',\
-    'E-','F-','G-','H-','AA+','BB+','CC+','DD+','AA-','BB-','CC-','DD-','EE+','FF+',\
-    'GG+','HH+','EE-','FF-','GG-','HH-']
+# section headers of the error log, its other lines are the entries
+logHeaders = ['In .stil but not in netlist:', 'In netlist but not in .stil:', \
+    'Repeated Definitions:', 'Invalid Channels:', 'Unusual Occurances:']
 
-# pin scale cards and their ranges of power supply channels 
-PS9G = ['31701-32416', '30101-30216', '30501-30616']
-DCS_DPS128HC = ['22501-22516','42501-42516','22901-22916','42901-42916']
-PS1600 = ['12501-13216', '11701-12416', '10101-10816', '20101-20816', '40101-40816',\
-    '10901-11616', '20901-21616', '40901-41616', '21701-22416', '41701-42416']
-DCS_UHC4T = ['22701-22704', '23001-23004']
-#openpyxl styles
-# Anything with VSS. Make the square black with white lettering.
-VSS = [PatternFill('solid', fgColor='00303030'), Font(color='00FFFFFF')]
-# Anything with VDD make the square Green with Black lettering.
-VDD = [PatternFill('solid', fgColor='0044E436'), Font(color='00000000')]
-# Signals just leave white with Black lettering.
-# Anything with Vref make it Babu Blue with black lettering.
-VREF = [PatternFill('solid', fgColor='0096FBF3'), Font(color='00000000')]
-# Anything with DAC or ADC make dark red with white lettering
-ACDC = [PatternFill('solid', fgColor='00B90A08'), Font(color='00FFFFFF')]
-
-LabelFill = PatternFill('solid', fgColor='00E0E0E0')
-Centered = Alignment(horizontal='center',vertical='center',wrapText=True)
-
-thinBorders = Border(left=Side(style='thin'),right=Side(style='thin'), \
-    top=Side(style='thin'), bottom=Side(style='thin'))
-
-def stil2config(inputFiles, outputDir, productName, card, anType, printErr):
+def stil2config(inputFiles, outputDir, productName, card, anType, printErr, jobs=1,\
+    sheets=None, cacheDir=None, cacheSize=defaultSize, writeCSV=False, incremental=False,\
+    cardsFile=cardFile, profiler=noProfile):
     '''    Takes in data containing pin defintion for a device and creates a .conf file
-    with all the provided information. Can accept the CSVs created by 
-    "still_assignment_csv" and/or "netlist_assignments_csv" or it can accept
-    the actual excel netlist and/or .stil file(s) themselves'''
-    stilFiles = []; netlistFile = None; netlistCSV = None; stilCSV = None
-    fileTypes = ['.xslx','.xls','.xlsm','.stil','assignments.csv']
+    with all the provided information. Can accept the .jsonl files (or CSVs) made
+    by "still_assignment_csv" and/or "netlist_assignments_csv" or it can accept
+    the actual excel netlist and/or .stil file(s) themselves. jobs is the number
+    of processes used to read the .stil files and netlist sheets (and to match
+    transfer names). sheets are the netlist sheet names or regular expressions
+    to use instead of asking. With a cacheDir the parsed netlist and .stil files
+    are kept there (see parse_cache).
+    writeCSV also writes the assignments to human readable csv files. In 
+    incremental mode only the pins whose netlist assignments or .stil signals
+    changed since the last incremental run are recomputed (the state is kept in
+    the output folder) and a summary of the changes is written. The power supply
+    channel ranges of the cards are read from cardsFile (see power_supply_cards).
+    The time and memory of each stage are recorded in profiler (see stage_profiler).
+    Returns the config file, error log and cross-refs file (None if not written)'''
+    try: cards = load_cards(cardsFile)
+    except: return print('Cannot read card definitions from '+str(cardsFile))
+    unknown = [x for x in card if not x in optional_cards(cards)]
+    if len(unknown) > 0:
+        return print('Unknown cards %s, cards must be in %s'%(', '.join(unknown), \
+            ', '.join(optional_cards(cards))))
+    psIndex = card_index(cards, card)
+    stilFiles = []; netlistFile = None; netlistAssignments = None; stilAssignments = None
+    fileTypes = ['.xslx','.xls','.xlsm','.stil','assignments.csv','assignments.jsonl']
     finalFiles = []
     inDir = None
     for file in inputFiles:
@@ -82,9 +106,16 @@ def stil2config(inputFiles, outputDir, productName, card, anType, printErr):
         if not os.path.isfile(file):
             print(file+' is not a file'); continue
         if file.endswith('.stil'): stilFiles.append(file)
-        elif file.endswith('stil_assignments.csv'): stilCSV = file
-        elif file.endswith('netlist_assignments.csv'): netlistCSV = file
+        # the .jsonl version is used if both it and the csv are given
+        elif file.endswith(('stil_assignments.jsonl','stil_assignments.csv')): 
+            if stilAssignments == None or file.endswith('.jsonl'): stilAssignments = file
+        elif file.endswith(('netlist_assignments.jsonl','netlist_assignments.csv')): 
+            if netlistAssignments == None or file.endswith('.jsonl'): 
+                netlistAssignments = file
         elif re.search('.xslx|.xls|.xlsm',file): netlistFile = file
+    if incremental: # the assignments left by the last run may be out of date
+        if netlistFile: netlistAssignments = None
+        if len(stilFiles) > 0: stilAssignments = None
     outputDir = os.path.realpath(re.sub('["\']','',outputDir))
     try:
         if not (os.path.isdir(outputDir)) :
@@ -96,63 +127,32 @@ def stil2config(inputFiles, outputDir, productName, card, anType, printErr):
     except: return print('Cannot use given output directory')
 
     if productName == None: # everything until the first period or underscore
-        fileName = netlistCSV if netlistCSV else netlistFile 
+        fileName = netlistAssignments if netlistAssignments else netlistFile 
         if fileName == None:
             return print('No netlist assignments found. Please provide either '\
                 'netlist CSV or netlist excel file')
-        productName = re.match('^(.*?)(?=(\.|_))',os.path.basename(fileName)).group(0)
+        productName = re.match(r'^(.*?)(?=(\.|_))',os.path.basename(fileName)).group(0)
         productName = productName.replace(' ','_')
     # get netlist assignments
-    netDict = None
-    ballMap = None
-    locations = {}
-    if netlistCSV == None and netlistFile :
-        netDict, netlistCSV, ballMap = netlist_assignments_csv(netlistFile,outputDir,productName,[None])
-    if netlistCSV :
-        with open(netlistCSV,'r') as netlist:
-            lines = netlist.readlines()
-            if not 'Pin Name,Channel' in lines[0]:
-                return print('\nCannot find valid netlist assignments')
-            tempDict = {}
-            ballMapPresent = False
-            for line in lines[1:]:
-                if ballMapPresent :
-                    try: 
-                        ballMap = ast.literal_eval(line)
-                        if len(ballMap.keys()) < 10: ballMap = None
-                    except: ballMap = None
-                    continue
-                if '##For Ball Map##' in line: ballMapPresent = True; continue
-                if len(line) < 4 or line.count(',')<2: break
-                try:
-                    data = line.replace('\n','').split(',')
-                    tempDict[data[0]] = data[1:]
-                    if ':Row' in data[-1] : 
-                        locations[data[0]] = data[-1]
-                        if data[-2].startswith('(') and data[-2].endswith(')'):
-                            locations[data[0]] = data[-2]+','+locations[data[0]]
-                        data.pop(-1)
-                except: pass
-            netDict = tempDict
-    if netDict == None or netlistCSV == None : 
+    if netlistAssignments == None and netlistFile :
+        netlistAssignments = netlist_assignments_csv(netlistFile,outputDir,productName,\
+            [None],jobs,sheets,cacheDir,cacheSize,writeCSV,profiler)
+        if netlistAssignments: netlistAssignments = netlistAssignments[1]
+    profiler.stage('assignments reading')
+    netlist = read_netlist_assignments(netlistAssignments) if netlistAssignments else None
+    if netlist == None : 
         return print('\nCannot find valid netlist assignments')
+    netDict, locations, ballMap, sites = netlist
     
     # get .stil assignments
-    stilList = None
-    if stilCSV == None and len(stilFiles)>0:
-        stilList, stilCSV = stil_assignments_csv(stilFiles,outputDir,productName)
-    if stilCSV and stilList == None:
-        with open(stilCSV,'r') as stil:
-            lines = stil.readlines()
-            if not 'Pin Name,In/Out/InOut' in lines[0]:
-                stilCSV == None
-                print('\nCannot find valid .stil assignments')
-            tempList = []
-            for line in lines[1:]:
-                if len(line) < 4: break
-                tempList.append(line[:line.find('\n')])
-            stilList = tempList
-    if stilList == None or stilCSV == None : 
+    stil = None
+    if stilAssignments == None and len(stilFiles)>0:
+        stilAssignments = stil_assignments_csv(stilFiles,outputDir,productName,jobs,\
+            cacheDir=cacheDir,cacheSize=cacheSize,writeCSV=writeCSV,profiler=profiler)
+        if stilAssignments: stilAssignments = stilAssignments[1]
+    profiler.stage('assignments reading')
+    if stilAssignments: stil = read_stil_assignments(stilAssignments)
+    if stil == None : 
         print('\nCannot find valid .stil files, getting all assignments from netlist'\
             ' names (All pins IO)')
         tempFile = os.path.join(outputDir,'temp_stil_file.stil')
@@ -161,179 +161,65 @@ def stil2config(inputFiles, outputDir, productName, card, anType, printErr):
             for key in netDict.keys():
                 tempStil.write(key+' InOut; \n')
             tempStil.write('}')
-        stilList, stilCSV = stil_assignments_csv([tempFile],outputDir,productName)
+        stilAssignments = stil_assignments_csv([tempFile],outputDir,productName,\
+            writeCSV=writeCSV,profiler=profiler)[1]
         os.remove(tempFile)
+        profiler.stage('assignments reading')
+        stil = read_stil_assignments(stilAssignments)
+    stilList, groups = stil
+    profiler.count('netlist pins', len(netDict)); profiler.count('stil signals', len(stilList))
 
-    #get number of sites from the netlist CSV header
-    with open(netlistCSV,'r') as net:
-        topLine = net.readline()
-        numbers = re.findall(r'\d+',topLine) # get biggest integer on top line
-        if len(numbers) == 0: sites = 1
-        else: sites = int(max(numbers))
-
+    profiler.stage('diffing')
     diffs, stilDiffs, netDiffs = get_diff(netDict,stilList,locations)
     # check for channels that dont have ball assignment: trigger channels
     extraCONFI = []
     try:
         #extraInNet = diffs[diffs.index('\nIn netlist but not in .stil:')+1:]  
         for net in netDiffs:
-            if '""' in netDict[net] : 
+            if '""' in netDict[net]['balls'] : 
                 stilList.append(net+',I'); extraCONFI.append(net)
                 diffs.remove(net)
     except:pass  
 
     #find if there are any names that have only be changed a bit netween stil & net
-    transferNames = {}
-    for sName in stilDiffs:
-        if sName in netDict.keys(): continue
-        for nName in netDiffs:
-            #reverse the string then look for the first group of numbers, then 
-            #reverse the string back and convert to an int
-            try:
-                stilNums = None; netNums = None
-                stilNums = re.search('\d+',sName[::-1])
-                if stilNums: stilNums = int(stilNums.group(0)[::-1])
-                else: stilNums = ''
-                netNums = re.search('\d+',nName[::-1])
-                if netNums: netNums = int(netNums.group(0)[::-1])
-                else: netNums = ''
-                if stilNums != netNums: continue
-            except: pass
-            #get just the letters
-            stilChars = None ; netChars = None
-            stilChars = re.sub('[\[\]]','',sName).split('_')
-            netChars = re.sub('[\[\]]','',nName).split('_')
-            testList = [] 
-            #check each chunk of var name to see if stil is a variant of net name
-            for Schunk in stilChars:
-                for Nchunk in netChars:
-                    if Nchunk in testList: continue
-                    #if the netlist chnk is substring of stil list chunk
-                    if Schunk == Nchunk or(len(Nchunk) > 1 and Nchunk in Schunk): 
-                        if not Nchunk in testList: testList.append(Nchunk); break
-            if testList == netChars and testList != []:
-                transferNames[nName] = [sName]
+    profiler.stage('transfer matching')
+    transfers = transfer_names([x for x in stilDiffs if not x in netDict], netDiffs, jobs)
+    transferNames = {nName:[transfers[nName]] for nName in transfers}
+    profiler.count('transfer names', len(transferNames))
+    profiler.stage('pin entries')
     #start writing to .conf file
     configFileName = os.path.relpath(os.path.join(outputDir,productName+'.conf'))
-    configFile = open(configFileName,'w')
-    configFile.write('hp93000,config,0.1\n')
-    entries = []
-    names = list(netDict.keys())
-    names += stilList
+    entries = {} # insertion ordered set of ConfigEntry
     PSs = []
     pinCounts = {}
-    for pinName in names:
-        stilName = None
-        if pinName.find(',')>0: # name has IO info in it
-            stilName = pinName
-            pinName = pinName[:pinName.find(',')]
-        if not pinName in netDict.keys(): continue #not in netlist
-        if pinName in pinCounts.keys(): continue
-        pinData = netDict[pinName]
-        #skip names that dont have coherent assignments
-        skip = False; matched = False
-        for datum in pinData: # case of channel, ball, channel, ball, etc
-            if re.match('([A-Z]{1,2}[0-9]{1,2})|(\"\")',datum): matched = True
-            if matched and re.match('^\d{3}',datum): skip = True
-        if skip : continue
-        pins = [x for x in pinData if re.match('([A-Z]{1,2}[0-9]{1,2})|(\"\")',x)] 
-        channels = [y for y in pinData if re.match('^\d{3}',y)] 
-        analog = False
-        #convert the channels to 5 number format
-        for i in range(0,len(channels)):
-            channel = channels[i]
-            # for analog pins that need the conversion (231A+ etc.)
-            # analog pins can only have one definition
-            if re.match('[0-9]{3}(([A-Z]{1,2}[+|-])|CT1|CT2)(\Z|\s|\b)',channel):
-                analog=True
-                for pad in conversionTable: #convert letters to pin #
-                    if re.sub('[0-9]','',channel).strip() != pad: continue
-                    if len(pad) == 3: io='o'
-                    else:io='i'
-                    if len(pins) == 1 and re.match('([A-Z]{1,2}[0-9]{1,2})',pins[0]):
-                        ball = pins[0]
-                    else: ball = ''
-                    if stilName:
-                        outString = 'DFAN "%s231,%d,%s","%s",(%s)'%    \
-                            (anType,conversionTable.index(pad)+1,io,ball,pinName)
-                        entries.append(outString); break
-            # format 123-P4 --> [12304]    
-            elif re.match('[0-9]{3}-P[0-9]{1,2}(\Z|\s|\b)',channel):
-                channelTemp = channel[0:3] + '%02d' % int(channel[5:])
-                channels[i] = [channelTemp]
-            # format 123-P4-P5 --> [12304,12305] 
-            elif re.match('[0-9]{3}-P[0-9]{1,2}-P[0-9]{1,2}(\Z|\s|\b)',channel) :
-                start = int(channel[channel.find('P')+1:channel.rfind('-')])
-                end = int(channel[channel.rfind('P')+1:])
-                channelTemp = []
-                for j in range(start, end+1):
-                    channelTemp.append(channel[0:3]+'%02d' % j)
-                channels[i] = channelTemp
-            # format 12345-6 --> [12345,12346]
-            elif re.match('[0-9]{5}-[0-9]{1,2}(\Z|\s|\b)',channel) :
-                start = int(channel[3:5])
-                end = int(channel[channel.find('-')+1:])
-                channelTemp = []
-                for j in range(start, end+1):
-                    channelTemp.append(channel[0:3]+'%02d' % j)
-                channels[i] = channelTemp
-            # already in format [12345]
-            else: channels[i] = [channel]
-        if analog: continue
-        i=0
-        isPS = False
-        if pinName in transferNames.keys() and channels != None:
-            for ch in channels:
-                transferNames[pinName] += ch
-        for chs in channels:
-            i+=1
-            for ch in chs:
-                if not(ch.isdigit() and len(ch) == 5): continue
-            if len(chs) ==1: chnlString = chs[0]
-            else: chnlString = '(%s)'%','.join(chs)
-            if i == 1: # first definition of a channel
-                # there are more than one ball numbers associated = power supply
-                if len(pins)>1 : 
-                    entry = 'DFPS ' + chnlString +',POS,('+pinName +')'
-                    if not entry in entries:
-                        entries.append(entry); isPS = True; pinCounts[pinName] = 1
-                # there are multiple channels in assignment [12345,12346]
-                elif len(chs) > 1: 
-                    entry = 'DFPS ' + chnlString +',POS,('+pinName +')'
-                    if not entry in entries:
-                        entries.append(entry); isPS = True; pinCounts[pinName] = 1
-                else:
-                    lists = [DCS_DPS128HC,DCS_UHC4T]
-                    if 'PS9G' in card: lists.append(PS9G)
-                    if 'PS1600' in card: lists.append(PS1600)
-                    # check to see if the channel is within the power supply ranges
-                    for l in lists:
-                        for ranges in l: # from range lists at top of doc
-                            low = int(ranges[:ranges.find('-')])
-                            high = int(ranges[ranges.find('-')+1:])
-                            firstCh = int(chs[0])
-                            if firstCh <= high and firstCh >= low : #if in PS range
-                                entry = 'DFPS ' + chnlString +',POS,('+pinName +')'
-                                if not entry in entries:
-                                    entries.append(entry); pinCounts[pinName] = 1
-                                isPS = True; break
-                # not a power supply, just a regular pin 
-                if not isPS and ((stilName and stilName in stilList) \
-                    or pinName in transferNames.keys()): 
-                    entry = 'DFPN %s,"%s",(%s)'%(chnlString,pins[0],pinName)
-                    #if its a trigger
-                    entry = entry.replace('""""','""')
-                    if not entry in entries:
-                        entries.append(entry); pinCounts[pinName] = 1
-                elif not isPS: break
-            # define PALS for multi-site
-            if i>1 :  
-                entry = 'PALS %d,%s,,(%s)'%(i,chnlString,pinName)
-                if not entry in entries and pinName in pinCounts.keys():
-                    entries.append(entry); pinCounts[pinName] += 1
-        if isPS and pinName not in PSs: PSs.append(pinName) # track power supplies
-    if len(PSs) > 0: entries.append('CONF DC,POWER,(%s)'%','.join(PSs))
-    entries.append('PSTE '+str(sites))
+    stilNames = {}
+    for stilName in stilList: 
+        stilNames.setdefault(stilName[:stilName.find(',')],[]).append(stilName)
+    # in incremental mode pins with the same inputs as last run reuse their entries
+    stateFile = os.path.join(outputDir,productName+'_config_state.pkl')
+    state = load_state(stateFile, psIndex, anType) if incremental else None
+    pinStates = {}; changed = []
+    stilCounts = {}
+    psChannels = power_supply_channels(netDict, psIndex)
+    for pinName in netDict.keys():
+        inputs = [netDict[pinName], stilNames.get(pinName,[]), pinName in transferNames]
+        if state and pinName in state['pins'] and state['pins'][pinName][0] == inputs:
+            result = state['pins'][pinName][1]
+        else:
+            result = pin_entries(pinName, *inputs, psChannels, anType)
+            changed.append(pinName)
+        pinStates[pinName] = (inputs, result)
+        pinEntries, pinCount, isPS, transferChannels, definedAs = result
+        entries.update(dict.fromkeys(pinEntries))
+        if pinCount > 0 and definedAs == None: pinCounts[pinName] = pinCount
+        elif pinCount > 0: stilCounts[definedAs] = pinCount
+        if isPS: PSs.append(pinName)
+        if pinName in transferNames: transferNames[pinName] += transferChannels
+    for stilName in stilList: # pins defined by their .stil signal come after
+        if stilName in stilCounts: 
+            pinCounts[stilName[:stilName.find(',')]] = stilCounts[stilName]
+    if len(PSs) > 0: entries[parse_entry('CONF DC,POWER,(%s)'%','.join(PSs))] = None
+    entries[parse_entry('PSTE '+str(sites))] = None
     #write the transfer file
     transferFile =  os.path.join(outputDir,productName+'_transfer_names.txt')
     if len(transferNames.keys()) > 0:
@@ -345,51 +231,29 @@ def stil2config(inputFiles, outputDir, productName, card, anType, printErr):
                 tnList[0] = name
                 tf.write(stilName + ' --> ' + ', '.join(tnList)+ '\n')
                 tnList[0] = stilName
-    # get all the group/conf definitions from the .stil conversion csv
-    with open(stilCSV,'r') as groupsFile:
-        content = groupsFile.read()
-        groups = content[content.find('#'):]
-        for nName in transferNames.keys():
-            sName = transferNames[nName][0]
-            try:
-                diffInd = diffs.index(sName)
-                diffs[diffInd] = diffs[diffInd]+' (transfer found)'
-            except: pass
-            groups = groups.replace(','+sName+',',','+nName+',')
-            groups = groups.replace(','+sName+')',','+nName+')')
-            groups = groups.replace('('+sName+',','('+nName+',')
-        for stilName in diffs: # replace ones that dont exist in stillist
-            groups = groups.replace(','+stilName+',',',')
-            groups = groups.replace(','+stilName+')',')')
-            groups = groups.replace('('+stilName+',','(')
-    if len(extraCONFI)>1: entries.append('DFGP I,(%s)(triggers)'%','.join(extraCONFI))
-    groups = groups.splitlines()
-    confNames = [x[x.rfind('(')+1:x.rfind(')')] for x in entries if x.startswith('DFPN')]
-    #rename groups if necessary
-    for group in groups:
-        gInd = groups.index(group)
-        gNames = group[group.find('(')+1:group.find(')')].split(',')
-        gNames = [x for x in gNames if x in confNames]
-        if group.startswith('CONF'): 
-            groups[gInd] = groups[gInd][:groups[gInd].find('(')+1] + ','.join(gNames) + ')'
-            continue
-        largestSub = (os.path.commonprefix(gNames)).lower()
-        if largestSub.endswith('_') or largestSub.endswith('['): 
-                largestSub = largestSub[0:len(largestSub)-1]
-        if len(largestSub) < 3 or len(gNames) < 2: groups[gInd] = None
-        else:
-            groups[gInd] = groups[gInd][:groups[gInd].rfind('(')+1] + largestSub + ')' 
+    # rename the group/conf definitions from the .stil conversion
+    profiler.stage('group rewriting')
+    renames = {}
+    for nName in transferNames.keys():
+        sName = transferNames[nName][0]
+        try:
+            diffInd = diffs.index(sName)
+            diffs[diffInd] = diffs[diffInd]+' (transfer found)'
+        except: pass
+        renames.setdefault(sName, nName) # the first netlist name it was changed to
+    if len(extraCONFI)>1: 
+        entries[parse_entry('DFGP I,(%s)(triggers)'%','.join(extraCONFI))] = None
+    confNames = set(x.pin for x in entries if x.kind == 'DFPN')
+    # ones that dont exist in stillist are removed
+    groups = rewrite_groups(groups, renames, set(diffs), confNames, extraCONFI)
     for group in groups:
-        if group == None: continue
-        if group.startswith('CONF I,') and len(extraCONFI) > 0:
-            group = group[:group.rfind(')')]+','+','.join(extraCONFI)+')'
-        # if (group.startswith('CONF') or group.startswith('DFGP')) and \
-        #     group[group.find('('):group.find(')')].count(',')>1 :
-        entries.append(group)      
-    order = ['DFPN','DFPS','DFAN','PALS','PSTE','CONF','DFGP']
-    entries = sorted(entries,key=lambda x:(order.index(x[0:4]),x[x.rfind('('):]))
+        entries[parse_entry(group)] = None
+    profiler.count('config groups', len(groups))
+    profiler.count('config entries', len(entries))
+    entries = sorted(entries,key=lambda x:x.key)
 
     #print differences to error log
+    profiler.stage('conf writing')
     errlogFile = os.path.join(outputDir,productName+'_config_error_log.txt')
     if os.path.isfile(errlogFile): os.remove(errlogFile)
     if len(diffs) > 2: 
@@ -397,11 +261,9 @@ def stil2config(inputFiles, outputDir, productName, card, anType, printErr):
             err.write('\n'.join(diffs).strip())
 
     # log repeated elements from config  
-    definitions = entries[0:entries.index('PSTE '+str(sites))]
+    definitions = entries[0:entries.index(parse_entry('PSTE '+str(sites)))]
     oddities = find_oddities(definitions,pinCounts,sites,locations)
-    configFile.write('\n'.join(entries))
-    configFile.write('\nNOOP "7.4.2",,,')
-    configFile.close()
+    write_config(configFileName, entries)
     if len(oddities) > 0:
         with open(errlogFile,'a') as err:
             err.write('\n' + '\n'.join(oddities).strip())
@@ -420,39 +282,251 @@ def stil2config(inputFiles, outputDir, productName, card, anType, printErr):
         print('Pin Name Cross-Refs location: ',os.path.relpath(transferFile))
     print('Config file location: '+ '\x1b[0;30;43m' +\
             configFileName + '\x1b[0m')
-    make_excel_docs(productName,outputDir,netDict,configFileName,ballMap)
+    # the ball map only needs redrawing if it (or without one, the config) changed
+    profiler.stage('excel rendering')
+    if state and ballMap == state['ballMap'] and os.path.isfile(state['mapFile']) and \
+        (ballMap or (len(changed) == 0 and entries == state['entries'])):
+        mapFile = state['mapFile']
+    else: mapFile = make_excel_docs(productName,outputDir,netDict,configFileName,ballMap)
+    if incremental:
+        profiler.stage('state writing')
+        changesFile = write_changes(productName, outputDir, state, entries, changed,\
+            netDict)
+        print('Change summary location: ',os.path.relpath(changesFile))
+        with open(stateFile,'wb') as stateOut:
+            pickle.dump({'version':version, 'decoder':channel_decoder.version, \
+                'format':assignments_file.formatVersion, 'psIndex':psIndex, 'anType':anType,\
+                'pins':pinStates, 'entries':entries, 'ballMap':ballMap, \
+                'mapFile':mapFile}, stateOut, protocol=pickle.HIGHEST_PROTOCOL)
+    return [configFileName, errlogFile if os.path.isfile(errlogFile) else None,\
+        transferFile if os.path.isfile(transferFile) else None]
+
+def load_state(stateFile, psIndex, anType):
+    '''Pins, entries and ball map saved by the last incremental run, or None if 
+    there is none or it was made by another version (of this script, the channel
+    decoder or the assignments file format) or with other cards (or other power
+    supply ranges)'''
+    try:
+        with open(stateFile,'rb') as stateIn: state = pickle.load(stateIn)
+    except: return None
+    if state.get('version') != version or state.get('psIndex') != psIndex or \
+        state.get('anType') != anType or state.get('decoder') != channel_decoder.version\
+        or state.get('format') != assignments_file.formatVersion: return None
+    return state
+
+def write_changes(productName, outputDir, state, entries, changed, pinNames):
+    '''Writes which pins were recomputed or removed and which .conf lines were
+    added and removed since the last incremental run. Returns the file name'''
+    changesFile = os.path.join(outputDir,productName+'_config_changes.txt')
+    with open(changesFile,'w') as changes:
+        if state == None:
+            changes.write('No previous run found, all %d pins computed\n'%len(pinNames))
+            return changesFile
+        removed = [name for name in state['pins'] if not name in pinNames]
+        oldEntries = set(state['entries']); newEntries = set(entries)
+        changes.write('Recomputed %d of %d pins\n'%(len(changed),len(pinNames)))
+        if len(changed) > 0: changes.write(', '.join(changed)+'\n')
+        if len(removed) > 0: changes.write('Removed pins: '+', '.join(removed)+'\n')
+        changes.write('\nAdded .conf lines:\n')
+        changes.write(''.join(str(x)+'\n' for x in entries if not x in oldEntries))
+        changes.write('\nRemoved .conf lines:\n')
+        changes.write(''.join(str(x)+'\n' for x in state['entries'] if not x in newEntries))
+    return changesFile
+
+def read_netlist_assignments(fileName):
+    '''Reads the pins (name to assignments_file pin record), locations, ball map
+    and number of sites from a netlist assignments .jsonl or csv file. Returns 
+    None if it is not a valid netlist assignments file'''
+    locations = {}
+    if fileName.endswith('.jsonl'):
+        assignments = read_assignments(fileName, 'netlist_assignments')
+        if assignments == None: return None
+        header, records = assignments
+        netDict = {record['name']:record for record in records.get('pin',[])}
+        for name in netDict: # the location the csv file shows, see pin_location
+            if netDict[name]['location'] != None:
+                locations[name] = netDict[name]['location']
+        ballMap = {record['ball']:record['label'] for record in records.get('ball',[])}
+        return [netDict, locations, ballMap if len(ballMap) > 0 else None, header['sites']]
+    with open(fileName,'r') as netlist:
+        lines = netlist.readlines()
+    if not 'Pin Name,Channel' in lines[0]: return None
+    netDict = {}
+    ballMap = None
+    ballMapPresent = False
+    for line in lines[1:]:
+        if ballMapPresent :
+            try: 
+                ballMap = ast.literal_eval(line)
+                if len(ballMap.keys()) < 10: ballMap = None
+            except: ballMap = None
+            continue
+        if '##For Ball Map##' in line: ballMapPresent = True; continue
+        if len(line) < 4 or line.count(',')<2: break
+        try:
+            data = line.replace('\n','').split(',')
+            netDict[data[0]] = pin_record(data[0], data[1:])
+            if netDict[data[0]]['location'] != None:
+                locations[data[0]] = netDict[data[0]]['location']
+        except: pass
+    #get number of sites from the netlist CSV header
+    numbers = re.findall(r'\d+',lines[0]) # get biggest integer on top line
+    sites = int(max(numbers)) if len(numbers) > 0 else 1
+    return [netDict, locations, ballMap, sites]
+
+def read_stil_assignments(fileName):
+    '''Reads the signal list (e.g. DATA_0,In) and the CONF/DFGP definitions (one
+    per line) from a .stil assignments .jsonl or csv file. Returns None if it is
+    not a valid .stil assignments file'''
+    if fileName.endswith('.jsonl'):
+        assignments = read_assignments(fileName, 'stil_assignments')
+        if assignments == None: return None
+        records = assignments[1]
+        stilList = [record['name']+','+record['direction'] for record in \
+            records.get('signal',[])]
+        groups = [definition_line(record) for record in \
+            records.get('conf',[]) + records.get('group',[])]
+        return [stilList, '\n'.join(groups)]
+    with open(fileName,'r') as stil:
+        content = stil.read()
+    lines = content.splitlines(True)
+    if not 'Pin Name,In/Out/InOut' in lines[0]:
+        print('\nCannot find valid .stil assignments')
+    stilList = []
+    for line in lines[1:]:
+        if len(line) < 4: break
+        stilList.append(line[:line.find('\n')])
+    return [stilList, content[content.find('#'):]]
+
+def power_supply_channels(netDict, psIndex):
+    '''Set of the 5 number channels of the netlist pins that are in the power
+    supply ranges of psIndex (see power_supply_cards)'''
+    channels = set()
+    for pinName in netDict:
+        for text in netDict[pinName]['channels']:
+            channel = decode_channel(text)
+            if channel.kind == 'digital': channels.update(channel_names(channel))
+    return {x for x in channels if x.isdigit() and is_power_supply(psIndex, int(x))}
+
+def pin_entries(pinName, pinData, stilNames, transfer, psChannels, anType):
+    '''Config entries (DFPN, DFPS, DFAN and PALS) of one netlist pin. pinData is its
+    assignments_file pin record, stilNames its signals in the .stil list (e.g.
+    ['DATA_0,In']), transfer is True if a .stil name was transferred to it and
+    psChannels are the power supply channels (see power_supply_channels).
+    Returns the entries, the number of times the pin was defined (0 if never),
+    whether it is a power supply, its channels for the cross-refs file and the
+    .stil signal it was defined as (None if defined as a netlist name)'''
+    entries = {}; pinCount = 0; anyPS = False; transferChannels = []
+    # first as a netlist name, then as each of its .stil signals until defined
+    for stilName in [None]+stilNames:
+        if pinCount > 0: break
+        definedAs = stilName
+        #skip names that dont have coherent assignments
+        if pinData['interleaved'] : break
+        pins = [x for x in pinData['balls'] if ballFormat.match(x)] 
+        channels = list(pinData['channels'])
+        analog = False
+        #convert the channels to 5 number format
+        for i in range(0,len(channels)):
+            channel = decode_channel(channels[i])
+            # for analog pins that need the conversion (231A+ etc.)
+            # analog pins can only have one definition
+            if channel.kind == 'analog':
+                analog=True
+                if channel.pad == None: continue
+                if len(pins) == 1 and re.match('([A-Z]{1,2}[0-9]{1,2})',pins[0]):
+                    ball = pins[0]
+                else: ball = ''
+                if stilName:
+                    entries[ConfigEntry('DFAN', ball=ball, pin=pinName, \
+                        analog=(anType,channel.pad,channel.direction))] = None
+            # 123-P4 --> [12304], 123-P4-P5 --> [12304,12305], 12345-6 --> [12345,12346]
+            elif channel.kind == 'digital': channels[i] = channel_names(channel)
+            else: channels[i] = [channel.text]
+        if analog: continue
+        i=0
+        isPS = False
+        if transfer and channels != None:
+            for ch in channels:
+                transferChannels += ch
+        for chs in channels:
+            i+=1
+            for ch in chs:
+                if not(ch.isdigit() and len(ch) == 5): continue
+            if i == 1: # first definition of a channel
+                # there are more than one ball numbers associated = power supply
+                if len(pins)>1 : 
+                    entry = ConfigEntry('DFPS', chs, pin=pinName)
+                    if not entry in entries:
+                        entries[entry] = None; isPS = True; pinCount = 1
+                # there are multiple channels in assignment [12345,12346]
+                elif len(chs) > 1: 
+                    entry = ConfigEntry('DFPS', chs, pin=pinName)
+                    if not entry in entries:
+                        entries[entry] = None; isPS = True; pinCount = 1
+                # check to see if the channel is within the power supply ranges
+                elif chs[0] in psChannels:
+                    entry = ConfigEntry('DFPS', chs, pin=pinName)
+                    if not entry in entries:
+                        entries[entry] = None; pinCount = 1
+                    isPS = True
+                # not a power supply, just a regular pin 
+                if not isPS and (stilName or transfer): 
+                    entry = ConfigEntry('DFPN', chs, pins[0], pinName)
+                    if not entry in entries:
+                        entries[entry] = None; pinCount = 1
+                elif not isPS: break
+            # define PALS for multi-site
+            if i>1 :  
+                entry = ConfigEntry('PALS', chs, pin=pinName, site=i)
+                if not entry in entries and pinCount > 0:
+                    entries[entry] = None; pinCount += 1
+        anyPS = anyPS or isPS # track power supplies
+    return [list(entries), pinCount, anyPS, transferChannels, definedAs]
+
+def entry_location(entry, locations):
+    '''(Sheet:Row) of the netlist row a pin definition came from. PALS use the
+    second location of the pin if it has 2, DFPN/DFPS/DFAN the first'''
+    if not entry.pin in locations: return ''
+    loc = locations[entry.pin]
+    if not ',' in loc: return loc
+    if entry.kind == 'PALS': return loc[loc.find(',')+1:]
+    if entry.kind.startswith('DF'): return loc[:loc.find(',')]
+    return loc
+
+def conflict_index(entries, locations):
+    '''Maps every channel, ball and analog pad of the pin definitions to the .conf 
+    line numbers and netlist locations that use it, in .conf order. Also returns
+    every use after the first one as (item, line number, location)'''
+    uses = {}; repeats = []
+    for lineNum, entry in enumerate(entries, 2): # line 1 is the header
+        loc = entry_location(entry, locations)
+        items = [ch for ch in entry.channels if ch.isdigit() and len(ch) == 5]
+        if entry.analog: items.append('%s231,%d,%s'%entry.analog)
+        if entry.ball: items.append(entry.ball)
+        for item in items:
+            if len(item) < 2: continue
+            if item in uses: repeats.append((item, lineNum, loc))
+            uses.setdefault(item,[]).append((lineNum, loc))
+    return uses, repeats
 
 def find_oddities(entries,pinCounts,sites,locations):
-    words = {}; oddities = []
-    for line in entries:
-        name = line[line.rfind('(')+1:line.rfind(')')]
-        if name in locations.keys():
-            if line.startswith('PALS') and ',' in locations[name]:
-                loc = locations[name][locations[name].find(',')+1:]
-            elif line.startswith('DF') and ',' in locations[name]:
-                loc = locations[name][:locations[name].find(',')]
-            else:
-                loc = locations[name]
-        else : loc = ''
-        #get the channel assignments and the ball assignments
-        defs = re.findall('.\d{5},',line)+re.findall('".*?"',line)
-        for nam in defs:
-            item = (nam[1:-1] if len(nam)>2 else None)
-            if item == None or (item and len(item) < 2) or item == '': continue
-            if item in words.keys(): 
-                if not '\n\nRepeated Definitions:' in oddities:
-                    oddities.append('\n\nRepeated Definitions:')
-                oddities.append('Repeated "%s" on .conf line %d %s, first occurance .conf line %s'%\
-                    (item,entries.index(line)+2,loc,words[item]))
-            else: words[item] = str(entries.index(line)+2) + ' ' + loc
-    
-    for pin in pinCounts.keys():
-        if pinCounts[pin] != sites:
-            if not '\n\nUnusual Occurances:' in oddities:
-                oddities.append('\n\nUnusual Occurances:')
-            errString = '%d occurence(s) of %s when there should be %d'% \
-                (pinCounts[pin], pin, sites)
-            oddities.append(errString)
+    '''Repeated channels and balls in the pin definitions, channels that are not
+    5 numbers (e.g. the range 12349-2) and pins defined a different number of
+    times than there are sites'''
+    oddities = []
+    uses, repeats = conflict_index(entries, locations)
+    if len(repeats) > 0: oddities.append('\n\nRepeated Definitions:')
+    for item, lineNum, loc in repeats:
+        oddities.append('Repeated "%s" on .conf line %d %s, first occurance .conf line %d %s'%\
+            ((item,lineNum,loc)+uses[item][0]))
+    invalid = ['"%s" on .conf line %d %s'%(ch, lineNum, entry_location(entry, \
+        locations)) for lineNum, entry in enumerate(entries, 2) for ch in entry.channels\
+        if not (ch.isdigit() and len(ch) == 5)]
+    if len(invalid) > 0: oddities += ['\n\nInvalid Channels:'] + invalid
+    unusual = ['%d occurence(s) of %s when there should be %d'%(pinCounts[pin], pin, \
+        sites) for pin in pinCounts.keys() if pinCounts[pin] != sites]
+    if len(unusual) > 0: oddities += ['\n\nUnusual Occurances:'] + unusual
     return oddities
 
 def get_diff(netDict,stilList,locations):
@@ -471,125 +545,257 @@ def get_diff(netDict,stilList,locations):
         if name not in stilListNames: differ.append(name+' '+loc); netDiff.append(name)
     return differ, stilDiff, netDiff
 
-def make_excel_docs(productName, outputDir, netDict, configFile, ballMap):
-    outFileName = os.path.join(outputDir,productName+'_BGA_Map.xlsx')
-    i = 0
-    while os.path.isfile(outFileName) :
-        i+=1
-        outFileName = outFileName[:outFileName.rfind('_Map')] + '_Map_' +str(i) + '.xlsx'
-    
-    workbook = openpyxl.Workbook()
-    
-    for worksheet in workbook.sheetnames : 
-        if workbook[worksheet].max_column == 1 and workbook[worksheet].max_row == 1:
-            del workbook[worksheet] # delete extra empty sheets
-    WS = workbook.create_sheet('Ball Map')
+def rewrite_groups(groups, renames, removed, confNames, triggers):
+    '''CONF and DFGP lines of the .stil groups text with their pins renamed (renames
+    is .stil name to netlist name) and the removed pins taken out. CONF lines only
+    keep the pins in confNames, CONF I also gets the triggers. DFGP lines are named
+    after the common start of their pins in confNames and dropped if that is less
+    than 3 letters or they have less than 2 such pins'''
+    lines = []
+    for group in groups.splitlines():
+        if not group.startswith(('CONF','DFGP')) or group.find(')') < group.find('('):
+            continue
+        start = group.find('('); end = group.find(')')
+        gNames = [renames.get(x,x) for x in group[start+1:end].split(',') \
+            if x in renames or not x in removed]
+        group = group[:start+1] + ','.join(gNames) + group[end:]
+        gNames = [x for x in gNames if x in confNames]
+        if group.startswith('CONF'): 
+            group = group[:start+1] + ','.join(gNames) + ')'
+            if group.startswith('CONF I,') and len(triggers) > 0:
+                group = group[:group.rfind(')')]+','+','.join(triggers)+')'
+            lines.append(group); continue
+        #rename groups if necessary
+        largestSub = (os.path.commonprefix(gNames)).lower()
+        if largestSub.endswith('_') or largestSub.endswith('['): 
+                largestSub = largestSub[0:len(largestSub)-1]
+        if len(largestSub) < 3 or len(gNames) < 2: continue
+        lines.append(group[:group.rfind('(')+1] + largestSub + ')')
+    return lines
+
+def ball_map_cells(netDict, configFile, ballMap):
+    '''Text of each ball of the map by (row, column), the row from the letters of
+    the ball and the column from its number (the axises are switched, B12 -->
+    (2, 12)). Uses the netlist ball map or, without one, the pins in the config'''
+    from openpyxl.utils.cell import column_index_from_string
     assignments = {}
-    if ballMap:
-        for ballLoc in ballMap.keys():
-            if ballLoc == '""':continue
-            #try:
-            row = column_index_from_string(re.sub('[^A-Z]','',ballLoc.upper()))
-            column = get_column_letter(int(re.sub('[^0-9]','',ballLoc)))
-            location = column + str(row)
-            WS[location] = ballMap[ballLoc]
-            #except:pass
+    if ballMap: assignments = ballMap
     else:
         with open(configFile,'r') as config:
             content = config.read()
         for pinName in netDict.keys(): 
             if content.find('('+pinName+')') < 0 : continue
-            line = ','.join(netDict[pinName]) + ','
-            balls = re.findall(',[A-Z]{1,3}[0-9]{1,3},',line)
-            channel = line[:line.find(',')]
+            balls = [x for x in netDict[pinName]['balls'] if \
+                re.fullmatch('[A-Z]{1,3}[0-9]{1,3}',x)]
+            channel = (netDict[pinName]['channels']+[''])[0]
             for ball in balls:
-                assignments[ball.replace(',','')] = pinName  + '\n' + channel
-        for ballLoc in assignments.keys():
-            if ballLoc == '""':continue
-            #switch the column and row
-            row = column_index_from_string(re.sub('[^A-Z]','',ballLoc.upper()))
-            column = get_column_letter(int(re.sub('[^0-9]','',ballLoc)))
-            location = column + str(row)
-            WS[location] = assignments[ballLoc] 
+                assignments[ball] = pinName  + '\n' + channel
+    cells = {}
+    for ballLoc in assignments.keys():
+        if ballLoc == '""':continue
+        row = column_index_from_string(re.sub('[^A-Z]','',ballLoc.upper()))
+        column = int(re.sub('[^0-9]','',ballLoc))
+        cells[row, column] = assignments[ballLoc]
+    return cells
+
+def ball_map_rows(cells):
+    '''Rows of the ball map as written, without the label row and column. Empty
+    rows are dropped the way deleting them from the sheet one at a time did: a
+    row only counts as empty if it has no text left of the last column, and the
+    row after a dropped one is kept. Returns the rows and the number of rows and
+    columns before dropping any'''
+    if len(cells) == 0: return [], 1, 1
+    maxRow = max(row for row, column in cells)
+    maxColumn = max(column for row, column in cells)
+    rows = [[cells.get((row, column)) for column in range(1,maxColumn+1)] \
+        for row in range(1,maxRow+1)]
+    for row in range(0,maxRow):
+        if row < len(rows) and not any(rows[row][0:maxColumn-1]): del rows[row]
+    return rows, maxRow, maxColumn
+
+def ball_map_styles(workbook):
+    '''Adds the named styles of the ball map to the workbook. Returns the style
+    names of a ball (by the kind of pin on it) and of the labels'''
+    from openpyxl.styles import Alignment, PatternFill, Font, Border, Side, NamedStyle
+    from openpyxl.styles.fonts import DEFAULT_FONT
+    from openpyxl.styles.borders import DEFAULT_BORDER
+    styles = {'ball':None, # Signals just leave white with Black lettering.
+        # Anything with VSS. Make the square black with white lettering.
+        'vss':[PatternFill('solid', fgColor='00303030'), Font(color='00FFFFFF')],
+        # Anything with VDD make the square Green with Black lettering.
+        'vdd':[PatternFill('solid', fgColor='0044E436'), Font(color='00000000')],
+        # Anything with Vref make it Babu Blue with black lettering.
+        'vref':[PatternFill('solid', fgColor='0096FBF3'), Font(color='00000000')],
+        # Anything with DAC or ADC make dark red with white lettering
+        'acdc':[PatternFill('solid', fgColor='00B90A08'), Font(color='00FFFFFF')]}
+    labelFill = PatternFill('solid', fgColor='00E0E0E0')
+    centered = Alignment(horizontal='center',vertical='center',wrapText=True)
+    thinBorders = Border(left=Side(style='thin'),right=Side(style='thin'), \
+        top=Side(style='thin'), bottom=Side(style='thin'))
+    for name in styles:
+        fill, font = styles[name] if styles[name] else [PatternFill(), copy(DEFAULT_FONT)]
+        workbook.add_named_style(NamedStyle('Ball Map '+name, font=font, fill=fill, \
+            border=thinBorders, alignment=centered))
+    workbook.add_named_style(NamedStyle('Ball Map label', font=copy(DEFAULT_FONT), \
+        fill=labelFill, border=copy(DEFAULT_BORDER), alignment=centered))
+    return 'Ball Map label'
+
+def ball_style(text):
+    '''Named style of a ball with text on it (see ball_map_styles)'''
+    if not text: return 'Ball Map ball'
+    text = text.lower()
+    if 'vss' in text: return 'Ball Map vss'
+    if 'vdd' in text: return 'Ball Map vdd'
+    if 'vref' in text: return 'Ball Map vref'
+    if 'adc' in text or 'dac' in text: return 'Ball Map acdc'
+    return 'Ball Map ball'
+
+def styled_cell(WS, value, style):
+    from openpyxl.cell import WriteOnlyCell
+    cell = WriteOnlyCell(WS, value); cell.style = style
+    return cell
+
+def make_excel_docs(productName, outputDir, netDict, configFile, ballMap):
+    '''Writes the ball map to a new <product>_BGA_Map.xlsx (numbered if there is
+    one already) and returns its name. The rows are worked out first then
+    streamed to a write only workbook'''
+    outFileName = os.path.join(outputDir,productName+'_BGA_Map.xlsx')
+    i = 0
+    while os.path.isfile(outFileName) :
+        i+=1
+        outFileName = outFileName[:outFileName.rfind('_Map')] + '_Map_' +str(i) + '.xlsx'
+    from openpyxl import Workbook
+    from openpyxl.utils.cell import get_column_letter
+    rows, maxRow, maxColumn = ball_map_rows(ball_map_cells(netDict, configFile, ballMap))
+    workbook = Workbook(write_only=True)
+    WS = workbook.create_sheet('Ball Map')
+    label = ball_map_styles(workbook)
     #set dimensions
-    for col in range(WS.max_column+1):
+    for col in range(maxColumn+1):
         WS.column_dimensions[get_column_letter(col+1)].width = 13
-    for row in range(WS.max_row+1):
+    for row in range(1,maxRow+1):
         WS.row_dimensions[row].height = 64   
-    #add borders and styles
-    for row in WS.rows:
-        for cell in row:
-            cell.border = thinBorders
-            cell.alignment = Centered
-            if not cell.value:continue 
-            if 'vss' in cell.value.lower():
-                cell.fill = VSS[0]; cell.font = VSS[1]
-            elif 'vdd' in cell.value.lower():
-                cell.fill = VDD[0]; cell.font = VDD[1]
-            elif 'vref' in cell.value.lower():
-                cell.fill = VREF[0]; cell.font = VREF[1]
-            elif 'adc' in cell.value.lower() or 'dac' in cell.value.lower():
-                cell.fill = ACDC[0]; cell.font = ACDC[1]
-    #delete empty rows
-    for row in range(1,WS.max_row+1):
-        empty = True
-        for col in range(1,WS.max_column):
-            if WS.cell(row=row,column=col).value: empty = False; break
-        if empty:
-            WS.delete_rows(row,1)
     #label the switched axises
-    WS.insert_cols(0,1); WS.insert_rows(0,1)
-    for row in range(1,WS.max_row):
-        WS.cell(row+1,1).value = get_column_letter(row)
-        WS.cell(row+1,1).alignment = Centered
-        WS.cell(row+1,1).fill = LabelFill
-    for col in range(1,WS.max_column):
-        WS.cell(1,col+1).value = col
-        WS.cell(1,col+1).alignment = Centered
-        WS.cell(1,col+1).fill = LabelFill
+    if len(rows) > 0:
+        WS.append([None]+[styled_cell(WS, col, label) for col in range(1,maxColumn+1)])
+    for row in range(0,len(rows)):
+        WS.append([styled_cell(WS, get_column_letter(row+1), label)]+\
+            [styled_cell(WS, text, ball_style(text)) for text in rows[row]])
+    for row in range(len(rows)+1 if len(rows) > 0 else 0, maxRow):
+        WS.append([]) # rows left empty by dropping rows keep their height
     workbook.save(outFileName)
+    return outFileName
 
 
+def watch_config(inOut, settle=defaultSettle, profileFile=None, **options):
+    '''Converts the netlist and .stil files in the inOut folder (the assignment
+    files in it if it has none) and converts them again every time they change
+    until interrupted (see watch_inputs). The parsed inputs and the digests of
+    the files that did not change are kept in memory between conversions (see
+    parse_cache), so only the files that changed are read again. Conversions are
+    incremental so the ball map is only drawn again when it changed. Each
+    conversion is profiled on its own and its report written to profileFile.
+    options are the stil2config arguments after the output folder'''
+    keep_in_memory()
+    options['incremental'] = True
+    def convert(inputFiles):
+        start = time.perf_counter()
+        profiler = Profiler(profileFile != None)
+        try: stil2config(inputFiles if inputFiles else [inOut], inOut, \
+            profiler=profiler, **options)
+        except KeyboardInterrupt: raise
+        except Exception as error: print('Cannot convert given files: '+str(error))
+        forget_unused()
+        write_profile(profiler, profileFile, 'stil2config', version)
+        print('Converted in %.1f s'%(time.perf_counter()-start))
+    watch(inOut, convert, settle=settle)
     
 if __name__ == '__main__' :
     parser = argparse.ArgumentParser(description=\
     '''    Takes in data containing pin defintion for a device and creates a .conf 
-    file with all the provided information. Can accept the CSVs created by 
-    "still_assignment_csv" and/or "netlist_assignments_csv" or it can accept
-    the actual excel netlist and/or .stil file(s) themselves''', \
+    file with all the provided information. Can accept the .jsonl files (or CSVs)
+    made by "still_assignment_csv" and/or "netlist_assignments_csv" or it can
+    accept the actual excel netlist and/or .stil file(s) themselves''', \
     formatter_class = argparse.RawTextHelpFormatter, epilog = 'usage examples:\n'\
         '   stil2config -i netlist.xlsx product_stil_assignments.stil -o productDir\n\n'\
-        '   stil2config -i netlist_assignments.csv -o productDir -n product -p\n\n'\
+        '   stil2config -i netlist_assignments.jsonl -o productDir -n product -p\n\n'\
         '   stil2config --io folder_with_xslx&stil -n product -c PS1600 -a MCB\n\n')
     parser.add_argument('-v', '-V', '--version', dest='version', action='store_true',\
         default=False, help='get version of script and exit')
     parser.add_argument('-i', '--input', nargs='+', dest='inputs', default=['.'], \
         help='path of excel file and .stil file(s) to convert or the already converted'\
-            '\ncsv version of both. can also take directory with files in it')
+            '\n.jsonl (or csv) version of both. can also take directory with files in it')
     parser.add_argument('-o', '--output', dest='outputDir', default='.', \
         help='output folder path. creates output path if DNE. DEFAULT current folder')
     parser.add_argument('--io', dest='inOut', default=None,\
         help='path to input and output directory if they are the same')
     parser.add_argument('-n', '--name', dest='name', default=None, \
         help='name of product and product version (e.g. fulda_B0)')
-    parser.add_argument('-c', '--cards', dest='psCard', default=['PS9G'],\
-        choices=['PS9G', 'PS1600'], nargs='+',
-        help='which pin scale card(s) are being used. DEFAULT: PS9G only')
+    parser.add_argument('-c', '--cards', dest='psCard', default=['PS9G'], nargs='+',\
+        help='which pin scale card(s) are being used (%s or any other card\n'\
+            'in the --card-file). DEFAULT: PS9G only' % ', '.join(optional_cards(load_cards())))
     parser.add_argument('-a', '--analog', dest='ana', default='MCE',\
         choices=['MCE', 'MCB','MCA'],
         help='which analog card is being used. DEFAULT: MCE')
     parser.add_argument('-p', '--print', dest='printerr', default=False,\
         action='store_true',help='print error log to terminal')
+    parser.add_argument('-j', '--jobs', dest='jobs', type=int, default=1, \
+        help='number of processes reading .stil files and netlist sheets.\n'\
+            '0 uses all cores. DEFAULT 1')
+    parser.add_argument('-s', '--sheets', nargs='+', dest='sheets', default=None, \
+        help='names or regular expressions of the netlist sheets to convert instead\n'\
+            'of asking (e.g. Site.* to get all sheets starting with Site)')
+    parser.add_argument('--cache', dest='cacheDir', default=defaultDir, \
+        help='folder of the parse cache. DEFAULT $STIL2CONFIG_CACHE or\n'\
+            '~/.cache/stil2config')
+    parser.add_argument('--no-cache', dest='cacheDir', action='store_const', \
+        const=None, help='always parse the netlist and .stil files, do not use the\n'\
+            'parse cache')
+    parser.add_argument('--cache-size', dest='cacheSize', type=int, default=defaultSize,\
+        help='size of the parse cache in MB. DEFAULT %d' % defaultSize)
+    parser.add_argument('--csv', dest='csv', action='store_true', default=False, \
+        help='also write the netlist and .stil assignments to human readable csvs')
+    parser.add_argument('--incremental', dest='incremental', action='store_true', \
+        default=False, help='only recompute the pins that changed since the last\n'\
+            'incremental run and write a summary of the changes')
+    parser.add_argument('--card-file', dest='cardFile', default=cardFile, \
+        help='JSON file of the cards and their power supply channel ranges.\n'\
+            'DEFAULT power_supply_cards.json next to this script')
+    parser.add_argument('--profile', dest='profile', default=None, \
+        help='write the time, CPU time and peak memory of each stage (workbook load,\n'\
+            'STIL parsing, diffing, ...) and the number of pins, signals, entries\n'\
+            'and groups to this JSON file. with --watch it is written again after\n'\
+            'each conversion')
+    parser.add_argument('--watch', dest='watch', action='store_true', default=False, \
+        help='keep running and convert the netlist and .stil files of the --io\n'\
+            'folder again every time they change. needs the sheets (-s). the\n'\
+            'parsed files are kept in memory unless --no-cache is given and\n'\
+            'every conversion is --incremental')
+    parser.add_argument('--settle', dest='settle', type=float, default=defaultSettle,\
+        help='seconds the watched files must stay the same before converting,\n'\
+            'so a burst of saves is converted once. DEFAULT %g' % defaultSettle)
     args = parser.parse_args()
     if args.version: print('Version '+version); sys.exit()
+    if args.watch and (args.inOut == None or args.sheets == None):
+        print('--watch needs the folder to watch (--io) and the netlist sheets (-s)')
+        sys.exit()
     if args.inOut != None :
         if not os.path.isdir(args.inOut) : 
             print(args.inOut,' is not a directory'); sys.exit()
         args.inputs = [args.inOut]
         args.outputDir = args.inOut
+    profiler = Profiler(args.profile != None and not args.watch)
     try:
-        stil2config(args.inputs,args.outputDir,args.name,args.psCard,args.ana,\
-            args.printerr)
+        if args.watch:
+            watch_config(args.inOut, args.settle, productName=args.name, card=args.psCard,\
+                anType=args.ana, printErr=args.printerr, jobs=args.jobs, sheets=args.sheets,\
+                cacheDir=args.cacheDir, cacheSize=args.cacheSize, writeCSV=args.csv, \
+                incremental=args.incremental, cardsFile=args.cardFile, \
+                profileFile=args.profile)
+        else: stil2config(args.inputs,args.outputDir,args.name,args.psCard,args.ana,\
+            args.printerr,args.jobs,args.sheets,args.cacheDir,args.cacheSize,args.csv,\
+            args.incremental,args.cardFile,profiler)
     except KeyboardInterrupt:
         print('\n Keyboard Interrupt: Process Killed')
+    write_profile(profiler, args.profile, 'stil2config', version)
     #except: print('Cannot convert given files')
\ No newline at end of file
@@ -14,21 +14,171 @@
 #################################################################
 #################################################################
 # Version 0.0 is first release 09.09.2021                       #
+# Version 0.1 reads .stil files with a streaming tokenizer that #
+#             stops after the header blocks                     #
+# Version 0.2 can read the .stil files in parallel (-j)         #
+# Version 0.3 merges signal directions in a dictionary          #
+# Version 0.4 indexed group merging, number of characters used  #
+#             to group pins is an option (-g)                   #
+# Version 0.5 signals of each file kept in a parse cache        #
+# Version 0.6 writes a .jsonl file, the csv is optional (--csv) #
+# Version 0.7 time and memory of each stage can be profiled     #
 #################################################################
 
-version = '0.0'
+version = '0.7'
 
 import argparse
 import os
 import re
 import sys
 import itertools
+from concurrent.futures import ProcessPoolExecutor
+from assignments_file import write_assignments
+from stage_profiler import Profiler, noProfile, write_profile
+from parse_cache import file_digest, cache_key, cache_load, cache_store, \
+    defaultDir, defaultSize
 
-def stil_assignments_csv(inputFiles,outputDir, productName):
+# quoted names, comments/annotations, braces, semicolons and plain words
+stilToken = re.compile(r'''"[^"]*(?:"|\Z)|'[^']*(?:'|\Z)|//[^\n]*(?:\n|\Z)|'''\
+    r'''/\*.*?(?:\*/|\Z)|\{\*.*?(?:\*\}|\Z)|[{};]|[^\s{};"'/]+|/''', re.S)
+headerBlocks = ['Signals', 'SignalGroups']
+# direction bitmasks, combined with | when a signal is in more than one file
+directions = {'In':1, 'Out':2, 'InOut':3}
+typeOrder = ['In','Out','InOut'] # indexed by bitmask-1
+
+def stil_tokens(stilFile, chunkSize=1<<20):
+    '''Yields the tokens of an open .stil file chunk by chunk so only the text
+    currently being tokenized is ever held in memory. Comments are dropped'''
+    buffer = ''
+    while True:
+        chunk = stilFile.read(chunkSize)
+        buffer += chunk
+        start = len(buffer)
+        for match in stilToken.finditer(buffer):
+            if chunk and match.end() == len(buffer): # may continue in next chunk
+                start = match.start(); break
+            token = match.group(0)
+            if not token.startswith(('//','/*','{*')): yield token
+        buffer = buffer[start:]
+        if not chunk: return
+
+def read_stil_header(inputFile, chunkSize=1<<20):
+    '''Reads the statements of the Signals and SignalGroups blocks of a .stil file
+    as lists of tokens. Stops at the first block after the header blocks (or the
+    first Pattern) so the vector data is never read'''
+    blocks = {name:[] for name in headerBlocks}
+    seen = []
+    statement = []; block = None; depth = 0
+    with open(inputFile,'r') as stilFile:
+        for token in stil_tokens(stilFile, chunkSize):
+            if token == '{':
+                if depth == 0:
+                    block = statement[0] if statement else None
+                    if block == 'Pattern' or (len(seen) == len(headerBlocks) and \
+                        block not in headerBlocks): break
+                    if block in headerBlocks and block not in seen: seen.append(block)
+                elif depth == 1 and block in blocks and statement:
+                    blocks[block].append(statement)
+                depth += 1; statement = []
+            elif token == '}':
+                depth -= 1; statement = []
+            elif token == ';':
+                if depth == 1 and block in blocks and statement:
+                    blocks[block].append(statement)
+                statement = []
+            elif depth <= 1: statement.append(token)
+    return blocks
+
+def read_stil_signals(inputFile):
+    '''Gets a dictionary of signal name to direction bitmask for one .stil file.
+    Signals that are not In/Out/InOut (e.g. Supply) are left out. Returns None
+    if the file has no signals'''
+    statements = read_stil_header(inputFile)['Signals']
+    if len(statements) == 0: return None
+    signals = {}
+    for statement in statements: # e.g. ['"DATA[0]"', 'In']
+        if len(statement) != 2 or not statement[1] in directions: continue
+        name = statement[0].replace('"','')
+        signals[name] = signals.get(name,0) | directions[statement[1]]
+    return signals
+
+def similar_group_names(k1, k2):
+    '''Compares two group keys without their direction (e.g. "data[3])"). True if
+    one is a substring of another or they have only 1 char difference'''
+    return k1!=k2 and (k1[:k1.find(')')] in k2[:k2.find(')')] or\
+        sum(k1[i] != k2[i] for i in range(min(len(k1),len(k2))))==1)
+
+def group_signals(directLists, prefixLen=4):
+    '''Groups together the sorted In, Out and InOut pin names that start with the
+    same prefixLen characters, then expands groups that have similar names. Returns
+    a dictionary of group key (e.g. "I-(data)") to pin names'''
+    directs = ['I','O','IO']
+    groupDict = {}
+    for i in range(0,len(directLists)):
+        iterator = itertools.groupby(directLists[i], lambda string: string[0:prefixLen])
+        for prefix, group in iterator:
+            group = list(group)
+            name = (os.path.commonprefix(group)).lower()
+            if name.endswith('_') or name.endswith('['): 
+                name = name[0:len(name)-1]
+            name = directs[i]+'-'+'(%s)'%name
+            names = [name]
+            if i == 2: names = [name[0]+name[2:],name[1:len(name)]]
+            for name in names: # InOut groups go into the I and O groups
+                if name in groupDict.keys(): groupDict[name]+= group
+                else: groupDict[name] = group
+    # index the names so each group is only compared to the groups it can match:
+    # names containing it, names it starts with and names 1 char different
+    keys = list(groupDict.keys())
+    order = dict(zip(keys, range(0,len(keys))))
+    names = [key[3:-1] for key in keys]
+    lengths = set(len(name) for name in names)
+    subIndex = {}; nameIndex = {}; oneOffIndex = {}
+    anyMatch = [] # names with ")" in them are compared to every group
+    for key, name in zip(keys, names):
+        if ')' in name: anyMatch.append(key); continue
+        nameIndex.setdefault(name,[]).append(key)
+        for length in lengths:
+            for j in range(0,len(name)-length+1):
+                subIndex.setdefault(name[j:j+length],[]).append(key)
+        for j in range(0,len(name)):
+            oneOffIndex.setdefault((name[:j],name[j+1:]),[]).append(key)
+    for key1, name in zip(keys, names): # expand groups with common substring in name
+        if not key1 in groupDict.keys(): continue
+        if name == '' or ')' in name: candidates = keys
+        else:
+            candidates = set(subIndex.get(name,[]) + anyMatch)
+            for j in range(0,len(name)):
+                candidates.update(nameIndex.get(name[:j],[]))
+                candidates.update(oneOffIndex.get((name[:j],name[j+1:]),[]))
+            candidates = sorted(candidates, key=order.get)
+        for key2 in candidates:
+            if key1 in groupDict.keys() and key2 in groupDict.keys() and \
+                similar_group_names(key1[3:], key2[3:]):
+                groupDict[key1]+=groupDict[key2]
+                del groupDict[key2]
+    return groupDict
+
+def definition_line(record):
+    '''.conf line of a conf or group record (e.g. CONF I,F160,(A,B) or 
+    DFGP I,(DATA_0,DATA_1),(data))'''
+    pins = ','.join(record['pins'])
+    if record['type'] == 'conf': return 'CONF %s,F160,(%s)'%(record['direction'],pins)
+    return 'DFGP %s,(%s),(%s)'%(record['direction'],pins,record['name'])
+
+def stil_assignments_csv(inputFiles,outputDir, productName, jobs=1, prefixLen=4,\
+    cacheDir=None, cacheSize=defaultSize, writeCSV=False, profiler=noProfile):
     '''Takes in a list of .stil files and gets all the pins definitions from them
-    along with IO status and groups together all similar names'''
+    along with IO status and groups together all similar names. With jobs other
+    than 1 the files are read in a pool of that many processes (0 = all cores).
+    prefixLen is the number of leading characters pins must share to be grouped.
+    With a cacheDir the signals of each file are kept there (see parse_cache) and
+    a file is only read again when its contents change. The signals and groups
+    are written to a .jsonl file (see assignments_file), and also to a csv if
+    writeCSV. The time and memory of each stage are recorded in profiler (see
+    stage_profiler)'''
     if productName == None: #get everything up until the first period or underscore
-        productName = re.match('^(.*?)(?=(\.|_))',os.path.basename(inputFiles[0])).group(0)
+        productName = re.match(r'^(.*?)(?=(\.|_))',os.path.basename(inputFiles[0])).group(0)
     productName = productName.replace(' ','_')
     # check output location
     outputDir = os.path.realpath(re.sub('["\']','',outputDir))
@@ -41,92 +191,63 @@ def stil_assignments_csv(inputFiles,outputDir, productName):
             return print('Output directory not accessible')
     except: return print('Cannot use given output directory')
 
-    signalList=[]
+    stilFiles = []
     for file in inputFiles: 
         # check inputs
         inputFile = os.path.realpath(re.sub('["\']','',file))
         if not os.path.isfile(inputFile) or not inputFile.endswith('.stil'): 
             return print(inputFile+' is not a file')
-        stilFile = open(inputFile, 'r')
-        contents = stilFile.read()
-        # get block of signal names
-        sigStartInd = contents.find('Signals {')+9
-        if sigStartInd == -1: return print('Cannot find signals in ',inputFile)
-        signals = contents[sigStartInd:sigStartInd+contents[sigStartInd:].find('}')]
-        signals = re.sub(' +', ' ', re.sub('(\n|")','',signals)).strip()+' '
-        signalList += list(set(signals.split(';'))- set(signalList)) #join non repeats 
-    signalList = [x.strip() for x in signalList]
-    # write all signals to csv
-    outputFile = os.path.join(outputDir,productName+'_stil_assignments.csv')
-    writeFile = open(outputFile, 'w')
-    writeFile.write('Pin Name,In/Out/InOut\n')  
-    updatedSignalList = []
-    for signal in signalList:
-        if signal.find(' In')>0 and signal.replace(' In',' InOut') in signalList: 
-            continue
-        elif signal.find(' Out')>0 and signal.replace(' Out',' InOut') in signalList:
-            continue
-        elif signal.find(' In')>0 and signal.replace(' In',' Out') in signalList: 
-            updatedSignalList.append(signal.replace(' In',',InOut'))
-        elif signal.find(' Out')>0 and signal.replace(' Out',' In') in signalList:
-            continue
-        else:
-            if signal == '':continue
-            updatedSignalList.append(signal.replace(' ',','))
-    signalList = updatedSignalList
-    typeOrder = [',In',',Out',',InOut','']
+        stilFiles.append(inputFile)
+    # get signal names and directions (e.g. "DATA[0]" In;) from every file
+    profiler.stage('stil parsing')
+    keys = [cache_key('stil', file_digest(inputFile), version) if cacheDir != None \
+        else None for inputFile in stilFiles]
+    fileSignals = [cache_load(cacheDir, key) for key in keys]
+    toRead = [i for i in range(0,len(stilFiles)) if fileSignals[i] == None]
+    if jobs != 1 and len(toRead) > 1:
+        with ProcessPoolExecutor(max_workers=(jobs if jobs > 0 else None)) as pool:
+            signalsRead = list(pool.map(read_stil_signals, [stilFiles[i] for i in toRead]))
+    else: signalsRead = [read_stil_signals(stilFiles[i]) for i in toRead]
+    for i, fileSignal in zip(toRead, signalsRead):
+        fileSignals[i] = fileSignal
+        if fileSignal != None: cache_store(cacheDir, keys[i], fileSignal, cacheSize)
+    # In in one file and Out in another (or InOut anywhere) makes it InOut
+    signals = {}
+    for inputFile, fileSignal in zip(stilFiles, fileSignals):
+        if fileSignal == None: return print('Cannot find signals in ',inputFile)
+        for name in fileSignal: 
+            signals[name] = signals.get(name,0) | fileSignal[name]
     #sort list first in typeOrder then alphabetically
-    signalList = sorted(signalList,key=lambda x:(typeOrder.index(x[x.find(','):]),x))
-    writeFile.write('\n'.join(signalList))
-        
-    # in out definitions for CONF
-    writeFile.write('\n\n#IN/OUTS#')
-    In =  [I[:I.find(',')] for I in signalList if I.endswith(',In')]
-    Out =  [O[:O.find(',')] for O in signalList if O.endswith(',Out')]
-    InOut =  [IO[:IO.find(',')] for IO in signalList if IO.endswith(',InOut')]
-    if len(In) > 0: writeFile.write('\nCONF I,F160,('+','.join(In)+')')
-    if len(Out) > 0: writeFile.write('\nCONF O,F160,('+','.join(Out)+')')
-    if len(InOut) > 0: writeFile.write('\nCONF IO,F160,('+','.join(InOut)+')')
-   #group definitions for DFGP
-    writeFile.write('\n\n#Groups#')
-    i = 0
-    directs = ['I','O','IO']
-    groupDict = {}
-    for lists in [In, Out, InOut]:
-        groups = []
-        iterator = itertools.groupby(lists, lambda string: string[0:4])
-        # number of chars to match by right here -------------------^
-        for lists, group in iterator:
-            groups.append(list(group))
-        for group in groups:
-            name = (os.path.commonprefix(group)).lower()
-            if name.endswith('_') or name.endswith('['): 
-                name = name[0:len(name)-1]
-            name = directs[i]+'-'+'(%s)'%name
-            if i == 2:
-                names = [name[0]+name[2:],name[1:len(name)]]
-                for name in names:
-                    if name in groupDict.keys(): groupDict[name]+= group
-                    else: groupDict[name] = group
-            else:
-                if name in groupDict.keys(): groupDict[name]+= group
-                else: groupDict[name] = group
-        i+=1
-    for key1 in list(groupDict.keys()): # expand groups with common substring in name
-        for key2 in list(groupDict.keys()):
-            if key1 in groupDict.keys() and key2 in groupDict.keys():
-                k1 = key1[3:]; k2 = key2[3:]
-                # one is a substring of another or they have only 1 char difference
-                if k1!=k2 and (k1[:k1.find(')')] in k2[:k2.find(')')] or\
-                    sum(k1[i] != k2[i] for i in range(min(len(k1),len(k2))))==1) :
-                    groupDict[key1]+=groupDict[key2]
-                    del groupDict[key2]
-    for name in groupDict.keys(): # define groups in .conf format
+    profiler.stage('signal grouping')
+    profiler.count('stil files', len(stilFiles)); profiler.count('signals', len(signals))
+    signalList = []; In = []; Out = []; InOut = []
+    for name in sorted(signals, key=lambda x:(signals[x],x+','+typeOrder[signals[x]-1])):
+        signalList.append(name+','+typeOrder[signals[name]-1])
+        [In, Out, InOut][signals[name]-1].append(name)
+    # in out definitions for CONF and group definitions for DFGP
+    records = [{'type':'signal', 'name':name, 'direction':typeOrder[signals[name]-1]} \
+        for name in In+Out+InOut]
+    for direct, pins in zip(['I','O','IO'], [In, Out, InOut]):
+        if len(pins) > 0: records.append({'type':'conf', 'direction':direct, 'pins':pins})
+    groupDict = group_signals([In, Out, InOut], prefixLen)
+    for name in groupDict.keys():
         if len(groupDict[name])>1:
-            groupLine = '\nDFGP '+name.replace('-',(',(%s),'%','.join(groupDict[name])))             
-            writeFile.write(groupLine)  
-    stilFile.close()
-    writeFile.close()
+            records.append({'type':'group', 'direction':name[:name.find('-')], \
+                'name':name[name.find('-')+2:-1], 'pins':groupDict[name]})
+    profiler.count('groups', sum(1 for record in records if record['type'] == 'group'))
+    profiler.stage('assignments writing')
+    outputFile = os.path.join(outputDir,productName+'_stil_assignments.jsonl')
+    write_assignments(outputFile, 'stil_assignments', records, product=productName)
+    if writeCSV: # human readable version
+        with open(outputFile[:outputFile.rfind('.')]+'.csv','w') as writeFile:
+            writeFile.write('Pin Name,In/Out/InOut\n')  
+            writeFile.write('\n'.join(signalList))
+            writeFile.write('\n\n#IN/OUTS#')
+            writeFile.write(''.join('\n'+definition_line(record) for record in records \
+                if record['type'] == 'conf'))
+            writeFile.write('\n\n#Groups#')
+            writeFile.write(''.join('\n'+definition_line(record) for record in records \
+                if record['type'] == 'group'))
     return [signalList,os.path.abspath(outputFile)]
 
 
@@ -145,10 +266,29 @@ if __name__ == '__main__' :
         help='output folder path. creates output path if DNE. DEFAULT current folder')
     parser.add_argument('-n', '--name', dest='name', default=None, \
         help='name of product and product version (e.g. fulda_B0)')
+    parser.add_argument('-j', '--jobs', dest='jobs', type=int, default=1, \
+        help='number of processes reading .stil files. 0 uses all cores. DEFAULT 1')
+    parser.add_argument('-g', '--group-chars', dest='prefixLen', type=int, default=4,\
+        help='number of leading characters pins must share to be grouped. DEFAULT 4')
+    parser.add_argument('--cache', dest='cacheDir', default=defaultDir, \
+        help='folder of the parse cache. DEFAULT $STIL2CONFIG_CACHE or\n'\
+            '~/.cache/stil2config')
+    parser.add_argument('--no-cache', dest='cacheDir', action='store_const', \
+        const=None, help='always read the .stil files, do not use the parse cache')
+    parser.add_argument('--cache-size', dest='cacheSize', type=int, default=defaultSize,\
+        help='size of the parse cache in MB. DEFAULT %d' % defaultSize)
+    parser.add_argument('--csv', dest='csv', action='store_true', default=False, \
+        help='also write the signals and groups to a human readable csv')
+    parser.add_argument('--profile', dest='profile', default=None, \
+        help='write the time, CPU time and peak memory of each stage and the\n'\
+            'number of signals and groups read to this JSON file')
     args = parser.parse_args()
     if args.version: print('Version '+version); sys.exit()
+    profiler = Profiler(args.profile != None)
     try:
-        stil_assignments_csv(args.inputs, args.outputDir, args.name)
+        stil_assignments_csv(args.inputs, args.outputDir, args.name, args.jobs, \
+            args.prefixLen, args.cacheDir, args.cacheSize, args.csv, profiler)
     except KeyboardInterrupt:
         print('\n Keyboard Interrupt: Process Killed')
-    except: print('Cannot convert given file')
\ No newline at end of file
+    except: print('Cannot convert given file')
+    write_profile(profiler, args.profile, 'stil_assignments_csv', version)
\ No newline at end of file
@@ -0,0 +1,44 @@
+import pytest
+from channel_decoder import decode_cell, decode_channel, channel_names
+
+@pytest.mark.parametrize('text, channels', [
+    ('12345', (12345,)),
+    ('12345-6', (12345,12346)),
+    ('12345-48', (12345,12346,12347,12348)),
+    ('12349-9', (12349,)),
+    ('123-P4', (12304,)),
+    ('123-P4-P5', (12304,12305)),
+    ('123-P9-P11', (12309,12310,12311))])
+def test_digital_channels(text, channels):
+    spec = decode_channel(text)
+    assert spec.kind == 'digital' and spec.channels == channels and spec.text == text
+
+@pytest.mark.parametrize('text', ['12349-2', '12345-40', '123-P5-P4'])
+def test_descending_ranges_are_not_channels(text):
+    spec = decode_channel(text)
+    assert spec.kind == 'other' and spec.channels == ()
+
+def test_analog_pads():
+    assert decode_channel('231A+')[1:] == ('analog', (), 1, 'i')
+    assert decode_channel('231HH-')[1:] == ('analog', (), 32, 'o')
+    assert decode_channel('231ZZ+')[1:] == ('analog', (), None, None)
+
+@pytest.mark.parametrize('cell, text', [
+    ('12345', '12345'),
+    ('CH12345', '12345'),
+    ('TC123.45', '12345'),
+    ('123-P4-P5', '123-P4-P5'),
+    ('PF1-PF12_DPS_345', '345-P1-P12'),
+    ('PF1_NAME_234', '234-P1'),
+    ('foo 12345 bar', '12345'),
+    ('12345, 12346', '12345'),
+    ('231HH-', '231HH-')])
+def test_cells(cell, text):
+    assert decode_cell(cell).text == text
+
+@pytest.mark.parametrize('cell', ['notes', 'A12', '1234', ''])
+def test_cells_without_channel(cell):
+    assert decode_cell(cell) == None
+
+def test_channel_names():
+    assert channel_names(decode_channel('101-P1-P2')) == ['10101', '10102']
@@ -0,0 +1,35 @@
+from config_to_stil import config_to_stil, stil_name
+from stil_assignments_csv import read_stil_header
+
+configText = '''hp93000,config,0.1
+DFPN 10101,"A1",(ADDR[7])
+PSTE 1
+CONF I,F160,(ADDR[7],DATA_0)
+CONF O,F160,()
+CONF IO,F160,(DATA_1)
+DFGP I,(ADDR[2],ADDR[5],ADDR[7]),(addr[7])
+DFGP I,(DATA_0,DATA_1),(data)
+DFGP O,(DATA_1),(data)
+DFGP I,(X,Y),(ghost)
+DFGP O,(DATA_0),(data)
+NOOP "7.4.2",,,'''
+
+def test_stil_names():
+    assert stil_name('DATA_0') == 'DATA_0' and stil_name('DATA[0]') == '"DATA[0]"'
+
+def test_signals_and_groups(tmp_path):
+    configFile = tmp_path / 'a.conf'; stilFile = tmp_path / 'a.stil'
+    configFile.write_text(configText)
+    assert config_to_stil(str(configFile), str(stilFile)) == (3, 3)
+    blocks = read_stil_header(str(stilFile))
+    assert blocks['Signals'] == [['"ADDR[7]"', 'In'], ['DATA_0', 'In'], \
+        ['DATA_1', 'InOut']]
+    # only declared signals, a later group with the same name gets its mode
+    assert blocks['SignalGroups'] == [['"addr[7]"', '=', '\'"ADDR[7]"\''], \
+        ['data', '=', "'DATA_0+DATA_1'"], ['data_O', '=', "'DATA_0'"]]
+
+def test_no_groups_left(tmp_path):
+    configFile = tmp_path / 'a.conf'; stilFile = tmp_path / 'a.stil'
+    configFile.write_text('CONF O,F160,()\nDFGP I,(X,Y),(ghost)\n')
+    assert config_to_stil(str(configFile), str(stilFile)) == (0, 0)
+    assert stilFile.read_text() == 'STIL 1.0;\n\nSignals {\n}\n'
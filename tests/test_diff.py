@@ -0,0 +1,58 @@
+import os
+import subprocess
+import sys
+from diff import diff_configs
+
+scriptDir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+oldLines = ['DFPN 10101,"A1",(DATA_0)',
+    'PALS 2,10301,,(DATA_0)',
+    'DFAN "MCE231,1,i","B2",(ADC_IN)',
+    'DFAN "MCE231,2,i","",(ADC_IN)',
+    'PSTE 2',
+    'CONF I,F160,(DATA_0,DATA_14,DATA_14)',
+    'DFGP I,(DATA_0,DATA_1),(data)']
+
+def write_conf(folder, name, lines):
+    fileName = os.path.join(str(folder), name)
+    with open(fileName,'w') as conf: conf.write('hp93000,config,0.1\n'+'\n'.join(lines))
+    return fileName
+
+def run_diff(*args):
+    return subprocess.run([sys.executable, os.path.join(scriptDir,'diff.py')]+\
+        list(args), capture_output=True, text=True)
+
+def test_same_files(tmp_path):
+    old = write_conf(tmp_path, 'old.conf', oldLines)
+    new = write_conf(tmp_path, 'new.conf', oldLines[5:]+oldLines[0:5]) # order of lines
+    changes = diff_configs(old, new)
+    assert changes['pins'] == [] and changes['groups'] == []
+    assert run_diff(old, new, '-q').returncode == 0
+
+def test_pin_changes_by_site(tmp_path):
+    old = write_conf(tmp_path, 'old.conf', oldLines)
+    new = write_conf(tmp_path, 'new.conf', ['DFPN 10102,"A1",(DATA_0)'] + \
+        oldLines[1:3] + ['DFAN "MCE231,3,i","",(ADC_IN)'] + oldLines[4:])
+    pins = diff_configs(old, new)['pins']
+    assert [(x['pin'], x['site'], x['field'], x['old'], x['new']) for x in pins] == \
+        [('ADC_IN', 2, 'analog', 'MCE231,2,i', 'MCE231,3,i'), \
+        ('DATA_0', 1, 'channels', ('10101',), ('10102',))]
+
+def test_removed_site(tmp_path):
+    old = write_conf(tmp_path, 'old.conf', oldLines)
+    new = write_conf(tmp_path, 'new.conf', oldLines[0:1]+oldLines[2:])
+    pins = diff_configs(old, new)['pins']
+    assert [(x['field'], x['site']) for x in pins] == [('sites', None), ('site', 2)]
+
+def test_group_members(tmp_path):
+    old = write_conf(tmp_path, 'old.conf', oldLines)
+    new = write_conf(tmp_path, 'new.conf', oldLines[0:5] + \
+        ['CONF I,F160,(DATA_14,DATA_0)', 'DFGP I,(DATA_0,DATA_2),(data)'])
+    groups = diff_configs(old, new)['groups']
+    assert [(x['kind'], x['group'], x['added'], x['removed']) for x in groups] == \
+        [('CONF', 'I,F160', [], ['DATA_14']), ('DFGP', 'data I', ['DATA_2'], ['DATA_1'])]
+    result = run_diff(old, new)
+    assert result.returncode == 1 and '- DATA_14' in result.stdout
+
+def test_missing_file(tmp_path):
+    old = write_conf(tmp_path, 'old.conf', oldLines)
+    assert run_diff(old, os.path.join(str(tmp_path), 'none.conf')).returncode == 2
@@ -0,0 +1,52 @@
+import itertools
+import os
+import random
+from stil_assignments_csv import group_signals
+
+def pairwise_groups(directLists, prefixLen=4):
+    '''Grouping of the first stil_assignments_csv, every group name compared with
+    every other one'''
+    directs = ['I','O','IO']
+    groupDict = {}
+    for i in range(0,len(directLists)):
+        for prefix, group in itertools.groupby(directLists[i], lambda x: x[0:prefixLen]):
+            group = list(group)
+            name = (os.path.commonprefix(group)).lower()
+            if name.endswith('_') or name.endswith('['): name = name[0:len(name)-1]
+            name = directs[i]+'-'+'(%s)'%name
+            names = [name[0]+name[2:],name[1:len(name)]] if i == 2 else [name]
+            for name in names:
+                if name in groupDict.keys(): groupDict[name]+= group
+                else: groupDict[name] = group
+    for key1 in list(groupDict.keys()):
+        for key2 in list(groupDict.keys()):
+            if key1 in groupDict.keys() and key2 in groupDict.keys():
+                k1 = key1[3:]; k2 = key2[3:]
+                if k1!=k2 and (k1[:k1.find(')')] in k2[:k2.find(')')] or\
+                    sum(k1[i] != k2[i] for i in range(min(len(k1),len(k2))))==1):
+                    groupDict[key1]+=groupDict[key2]
+                    del groupDict[key2]
+    return groupDict
+
+def test_groups_by_prefix():
+    groups = group_signals([['ADDR_0','ADDR_1','CLK'], ['DATA_0','DATA_1'], []])
+    assert groups == {'I-(addr)':['ADDR_0','ADDR_1'], 'I-(clk)':['CLK'], \
+        'O-(data)':['DATA_0','DATA_1']}
+
+def test_inout_pins_are_input_and_output():
+    groups = group_signals([[], [], ['GPIO_0','GPIO_1']])
+    assert groups == {'I-(gpio)':['GPIO_0','GPIO_1'], 'O-(gpio)':['GPIO_0','GPIO_1']}
+
+def test_same_as_pairwise_grouping():
+    words = ['ADDR','ADD','DATA','DAT','DATB','CLK','CK','A','AD','GPIO','SPI_MOSI']
+    for seed in range(0,200):
+        rand = random.Random(seed)
+        lists = []
+        for direction in range(0,3):
+            names = set(rand.choice(words)+rand.choice(['_','[','','_X'])+str(\
+                rand.randint(0,12))+rand.choice(['',']','_N']) for i in range(0,\
+                rand.randint(0,15)))
+            lists.append(sorted(names))
+        prefixLen = rand.randint(1,5)
+        assert group_signals([list(x) for x in lists], prefixLen) == \
+            pairwise_groups([list(x) for x in lists], prefixLen)
@@ -0,0 +1,51 @@
+from hp93000_config import ConfigEntry, parse_entry, read_config, write_config, \
+    header, trailer
+
+configLines = ['DFPN 10101,"A1",(DATA_0)',
+    'DFPS (10201,10202),POS,(VDD)',
+    'DFAN "MCE231,1,i","B2",(ADC_IN)',
+    'PALS 2,10301,,(DATA_0)',
+    'PSTE 2',
+    'CONF I,F160,(DATA_0,ADC_IN)',
+    'CONF O,F160,()',
+    'DFGP I,(DATA_0,DATA_1),(data)',
+    'NOOP "7.4.2",,,']
+
+def test_pin_definitions_are_parsed():
+    dfpn, dfps, dfan, pals = [parse_entry(line) for line in configLines[0:4]]
+    assert (dfpn.kind, dfpn.channels, dfpn.ball, dfpn.pin) == \
+        ('DFPN', ('10101',), 'A1', 'DATA_0')
+    assert dfps.channels == ('10201','10202') and dfps.pin == 'VDD'
+    assert dfan.analog == ('MCE', 1, 'i') and dfan.ball == 'B2'
+    assert pals.site == 2 and pals.text == None
+    assert dfpn == ConfigEntry('DFPN', ['10101'], 'A1', 'DATA_0')
+
+def test_groups_keep_their_text():
+    conf, empty, dfgp = [parse_entry(line) for line in configLines[5:8]]
+    assert conf.mode == 'I' and conf.pins == ('DATA_0','ADC_IN')
+    assert empty.pins == ('',)
+    assert dfgp.mode == 'I' and dfgp.pins == ('DATA_0','DATA_1')
+
+def test_other_formatting_is_kept_as_is():
+    entry = parse_entry('DFPN 10101, "A1",(DATA_0)')
+    assert entry.text == 'DFPN 10101, "A1",(DATA_0)'
+    assert str(entry) == entry.text
+
+def test_round_trip(tmp_path):
+    configFile = tmp_path / 'a.conf'
+    configFile.write_text(header+'\n'+'\n'.join(configLines)+'\n\n')
+    entries = list(read_config(str(configFile)))
+    assert [str(entry) for entry in entries] == configLines
+    copyFile = tmp_path / 'b.conf'
+    write_config(str(copyFile), entries)
+    assert copyFile.read_text() == header+'\n'+'\n'.join(configLines)
+
+def test_trailer_is_added(tmp_path):
+    configFile = tmp_path / 'a.conf'
+    lines = write_config(str(configFile), [parse_entry(configLines[0])])
+    assert lines == [configLines[0], trailer]
+
+def test_entries_sort_by_kind_then_pin():
+    entries = [parse_entry(line) for line in reversed(configLines[0:5])]
+    assert [x.kind for x in sorted(entries, key=lambda x:x.key)] == \
+        ['DFPN','DFPS','DFAN','PALS','PSTE']
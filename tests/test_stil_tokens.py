@@ -0,0 +1,36 @@
+import io
+from stil_assignments_csv import stil_tokens, read_stil_header, read_stil_signals
+
+stilText = '''STIL 1.0;
+// comment { with braces }
+Header { Title "synthetic { header }"; }
+Signals {
+  "DATA[0]" In; DATA_1 Out; /* block
+  comment */ CLK InOut;
+  VDD Supply { ScanIn; }
+}
+SignalGroups {
+  all = 'DATA_1+CLK';
+}
+Pattern p { V { all = 01; } }
+'''
+
+def tokens(text, chunkSize):
+    return list(stil_tokens(io.StringIO(text), chunkSize))
+
+def test_tokens_do_not_depend_on_chunk_size():
+    expected = tokens(stilText, 1<<20)
+    assert expected[:3] == ['STIL', '1.0', ';']
+    assert '"synthetic { header }"' in expected
+    assert not any(token.startswith(('//','/*')) for token in expected)
+    for chunkSize in range(1, 40):
+        assert tokens(stilText, chunkSize) == expected
+
+def test_header_blocks(tmp_path):
+    stilFile = tmp_path / 'a.stil'
+    stilFile.write_text(stilText)
+    blocks = read_stil_header(str(stilFile), chunkSize=5)
+    assert blocks['Signals'][:3] == [['"DATA[0]"', 'In'], ['DATA_1', 'Out'], \
+        ['CLK', 'InOut']]
+    assert blocks['SignalGroups'] == [['all', '=', "'DATA_1+CLK'"]]
+    assert read_stil_signals(str(stilFile)) == {'DATA[0]':1, 'DATA_1':2, 'CLK':3}
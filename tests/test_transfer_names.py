@@ -0,0 +1,53 @@
+import random
+import re
+from transfer_names import transfer_names, last_number, name_chunks
+
+def number(name):
+    '''Last group of numbers of a name, '' if it has none'''
+    numbers = re.findall(r'\d+', name)
+    return int(numbers[-1]) if numbers else ''
+
+def all_pairs(stilNames, netNames):
+    '''Matching of the first stil2config, every .stil name compared with every
+    netlist name'''
+    transfers = {}
+    for sName in stilNames:
+        for nName in netNames:
+            if number(sName) != number(nName): continue
+            stilChars = re.sub(r'[\[\]]','',sName).split('_')
+            netChars = re.sub(r'[\[\]]','',nName).split('_')
+            testList = []
+            for Schunk in stilChars:
+                for Nchunk in netChars:
+                    if Nchunk in testList: continue
+                    if Schunk == Nchunk or (len(Nchunk) > 1 and Nchunk in Schunk):
+                        testList.append(Nchunk); break
+            if testList == netChars and testList != []: transfers[nName] = sName
+    return transfers
+
+def test_name_parts():
+    assert last_number('DATA_IN[12]') == 12
+    assert last_number('U1_DATA_007') == 7
+    assert last_number('CLK') == ''
+    assert name_chunks('DATA_IN[3]') == ['DATA', 'IN3']
+
+def test_variants_are_found():
+    transfers = transfer_names(['U1_DATA_3', 'CLK_IN', 'ADDR[4]'], \
+        ['DATA_3', 'DAT_3', 'CLK', 'ADDR_5', 'ADDR4'])
+    assert transfers == {'DATA_3':'U1_DATA_3', 'DAT_3':'U1_DATA_3', 'CLK':'CLK_IN',\
+        'ADDR4':'ADDR[4]'}
+
+def test_same_as_all_pairs():
+    words = ['DATA','DAT','ADDR','AD','CLK','U1','IN','OUT','A','X']
+    def name(rand):
+        chunks = [rand.choice(words) for i in range(0,rand.randint(1,3))]
+        if rand.random() < 0.8: chunks.append(str(rand.randint(0,4)))
+        text = '_'.join(chunks)
+        if '_' in text and rand.random() < 0.2: text = text.replace('_','[',1)+']'
+        return text
+    for seed in range(0,100):
+        rand = random.Random(seed)
+        stilNames = [name(rand) for i in range(0,rand.randint(0,25))]
+        netNames = [name(rand) for i in range(0,rand.randint(0,25))]
+        assert transfer_names(stilNames, netNames) == all_pairs(stilNames, netNames)
+    assert transfer_names(stilNames, netNames, jobs=2) == all_pairs(stilNames, netNames)
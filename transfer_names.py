@@ -0,0 +1,94 @@
+#!/usr/bin/python3
+#################################################################
+#                       transfer_names                          #
+#################################################################
+#                                                               #
+#   Finds the .stil names that are only a variant of a netlist  #
+#   name (e.g. DATA_0 in the .stil and DAT_0 in the netlist).   #
+#   Names are only compared with names that have the same last  #
+#   number and share their _ chunks                             #
+#                                                               #
+#################################################################
+# Version 0.0                                                   #
+#################################################################
+#################################################################
+# Version 0.0 is first release                                  #
+#################################################################
+
+version = '0.0'
+
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+def last_number(name):
+    '''Last group of numbers in the name as an int, '' if it has none'''
+    numbers = re.findall(r'\d+', name)
+    return int(numbers[-1]) if len(numbers) > 0 else ''
+
+def name_chunks(name):
+    '''DATA_IN[3] --> ['DATA','IN3']'''
+    return re.sub(r'[\[\]]','',name).split('_')
+
+def chunks_match(stilChars, netChars):
+    '''True if every chunk of the netlist name is, in order, the same as or (if
+    longer than one letter) part of a chunk of the .stil name'''
+    testList = []
+    for Schunk in stilChars:
+        for Nchunk in netChars:
+            if Nchunk in testList: continue
+            #if the netlist chnk is substring of stil list chunk
+            if Schunk == Nchunk or(len(Nchunk) > 1 and Nchunk in Schunk):
+                if not Nchunk in testList: testList.append(Nchunk); break
+    return testList == netChars and testList != []
+
+def chunk_keys(stilChars):
+    '''Every netlist chunk that chunks_match could match to a chunk of the .stil
+    name: the chunk itself and its parts longer than one letter'''
+    keys = set()
+    for Schunk in stilChars:
+        keys.add(Schunk)
+        for start in range(0,len(Schunk)-1):
+            for end in range(start+2,len(Schunk)+1): keys.add(Schunk[start:end])
+    return keys
+
+def match_bucket(stilNames, netNames):
+    '''Matches within the names of one last number bucket. Names are (position,
+    chunks) pairs. Returns the (stil position, netlist position) matches'''
+    # inverted index of the chunks of the netlist names
+    index = {}
+    for n, netChars in netNames:
+        for chunk in set(netChars): index.setdefault(chunk,[]).append(n)
+    needed = {n:len(set(netChars)) for n, netChars in netNames}
+    chunks = dict(netNames)
+    matches = []
+    for s, stilChars in stilNames:
+        # a netlist name is only a candidate if all its chunks can be matched
+        found = {}
+        for key in chunk_keys(stilChars) & index.keys():
+            for n in index[key]: found[n] = found.get(n,0) + 1
+        for n in found:
+            if found[n] == needed[n] and chunks_match(stilChars, chunks[n]):
+                matches.append((s, n))
+    return matches
+
+def transfer_names(stilNames, netNames, jobs=1):
+    '''Dictionary of netlist name to the .stil name it was changed to, the same
+    as comparing every .stil name with every netlist name in order (the last
+    matching .stil name wins). The last number buckets are matched in a pool of
+    jobs processes if jobs is not 1 (0 = all cores)'''
+    buckets = {}
+    for s in range(0,len(stilNames)):
+        bucket = buckets.setdefault(last_number(stilNames[s]),([],[]))
+        bucket[0].append((s, name_chunks(stilNames[s])))
+    for n in range(0,len(netNames)):
+        if last_number(netNames[n]) in buckets:
+            buckets[last_number(netNames[n])][1].append((n, name_chunks(netNames[n])))
+    buckets = [bucket for bucket in buckets.values() if len(bucket[1]) > 0]
+    if jobs != 1 and len(buckets) > 1:
+        with ProcessPoolExecutor(max_workers=(jobs if jobs > 0 else None)) as pool:
+            found = list(pool.map(match_bucket, *zip(*buckets)))
+    else: found = [match_bucket(*bucket) for bucket in buckets]
+    transfers = {}
+    for s, n in sorted(match for matches in found for match in matches):
+        transfers[netNames[n]] = stilNames[s]
+    return transfers
@@ -0,0 +1,75 @@
+#!/usr/bin/python3
+#################################################################
+#                         watch_inputs                          #
+#################################################################
+#                                                               #
+#   Polls a folder for changes to its netlists and .stil files  #
+#   and reruns a conversion once the changes have settled, so   #
+#   a burst of saves is converted once (stil2config --watch)    #
+#                                                               #
+#################################################################
+# Version 0.0                                                   #
+#################################################################
+#################################################################
+# Version 0.0 is first release                                  #
+#################################################################
+
+version = '0.0'
+
+import os
+import re
+import time
+
+inputExts = ('.xlsx', '.xls', '.xlsm', '.stil')
+# files left by editors while a file is open (e.g. ~$netlist.xlsx)
+ignoredPrefixes = ('~$', '.~lock', '.#')
+# outputs written to the folder that look like inputs (e.g. prod_BGA_Map_1.xlsx)
+ignoredOutputs = re.compile('.*_BGA_Map(_[0-9]+)?[.]xlsx|temp_stil_file[.]stil')
+defaultInterval = 0.25 # seconds between polls
+defaultSettle = 0.5 # seconds without changes before converting
+
+def input_snapshot(folder):
+    '''Dictionary of the netlist and .stil files in the folder (not the ball maps
+    written there) to their modified time and size'''
+    snapshot = {}
+    try: names = os.listdir(folder)
+    except OSError: return snapshot
+    for name in names:
+        if not name.lower().endswith(inputExts) or name.startswith(ignoredPrefixes) \
+            or ignoredOutputs.fullmatch(name): continue
+        fileName = os.path.join(folder, name)
+        try: stat = os.stat(fileName)
+        except OSError: continue # removed while listing
+        snapshot[fileName] = (stat.st_mtime_ns, stat.st_size)
+    return snapshot
+
+def changed_files(before, after):
+    '''Names of the files added, removed or changed between two snapshots'''
+    return sorted(name for name in before.keys() | after.keys() \
+        if before.get(name) != after.get(name))
+
+def wait_for_change(folder, snapshot, interval=defaultInterval, settle=defaultSettle):
+    '''Polls the folder until its inputs are not the same as the snapshot and then
+    stay the same for settle seconds (a save often writes a file more than once).
+    Returns the new snapshot and the files changed'''
+    while True:
+        time.sleep(interval)
+        current = input_snapshot(folder)
+        if current != snapshot: break
+    settled = time.monotonic()
+    while time.monotonic()-settled < settle:
+        time.sleep(interval)
+        latest = input_snapshot(folder)
+        if latest != current: current = latest; settled = time.monotonic()
+    return current, changed_files(snapshot, current)
+
+def watch(folder, convert, interval=defaultInterval, settle=defaultSettle):
+    '''Calls convert(inputFiles) with the netlist and .stil files in the folder,
+    then again every time they change, until interrupted (Ctrl+C). The snapshot
+    is taken before converting so a save made while converting is not missed'''
+    snapshot = input_snapshot(folder)
+    while True:
+        convert(sorted(snapshot))
+        print('\nWatching %s for changes (Ctrl+C to stop)'%os.path.relpath(folder))
+        snapshot, changed = wait_for_change(folder, snapshot, interval, settle)
+        print('\nChanged: '+', '.join(os.path.basename(x) for x in changed))